@@ -0,0 +1,210 @@
+"""Concurrent-classroom load test for the lesson pages.
+
+Simulates N students with Streamlit's ``AppTest``. Each student enters a
+name, then repeatedly switches task type, runs a correct and an incorrect
+query and moves to the next task.
+
+AppTest swaps a process-global runtime on every run, so sessions cannot run
+in parallel threads of one process. Students are spread over worker
+processes instead; inside a worker they take turns rerun by rerun and
+share the process-wide caches, like sessions on one server do.
+
+Reports p50/p95/p99 rerun latency, throughput and peak RSS, and appends the
+results to ``benchmarks/results/load_test.jsonl`` tagged with the current
+git revision so hot-path regressions show up across versions.
+
+    python benchmarks/load_test.py --students 30 --workers 4
+"""
+import argparse
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_FILE = os.path.join(ROOT, "benchmarks", "results", "load_test.jsonl")
+PAGES = {
+    "basics": ("pages/1_Basics_and_Filters.py", "Run Query", "Next Task"),
+    "complex": ("pages/2_Complex_Queries.py", "▶️ Run Query", "Next Task ➡️"),
+}
+WRONG_QUERY = "SELECT name FROM employees WHERE 1 = 0;"
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "describe", "--always", "--dirty"], cwd=ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def share_script_cache():
+    """Compile each page once per worker, as the real server does.
+
+    AppTest builds a fresh ScriptCache, and so recompiles the page, on every
+    run, which would dominate the measured latency.
+    """
+    from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+    from streamlit.testing.v1 import local_script_runner
+
+    shared = ScriptCache()
+    local_script_runner.ScriptCache = lambda: shared
+
+
+class Student:
+    def __init__(self, number, lesson, rounds, seed, timeout):
+        self.number = number
+        self.lesson = lesson
+        self.rounds = rounds
+        self.random = random.Random(seed + number)
+        self.timeout = timeout
+        self.latencies = []
+        self.errors = []
+
+    def _timed(self, action):
+        started = time.perf_counter()
+        app = action()
+        self.latencies.append((time.perf_counter() - started) * 1000)
+        if app.exception:
+            self.errors.append(app.exception[0].value)
+
+    @staticmethod
+    def _button(app, label):
+        return next(button for button in app.button if button.label == label)
+
+    def session(self):
+        """Run the scenario, yielding after every rerun so students interleave."""
+        from streamlit.testing.v1 import AppTest
+        from core.catalog import load_catalog
+
+        page, run_label, next_label = PAGES[self.lesson]
+        catalog = load_catalog(self.lesson)
+        app = AppTest.from_file(os.path.join(ROOT, page), default_timeout=self.timeout)
+        try:
+            self._timed(app.run)
+            yield
+            self._timed(app.text_input[0].input(f"Student {self.number}").run)
+            yield
+            for _ in range(self.rounds):
+                category = self.random.choice(catalog.categories)
+                app.session_state["task_index"] = 0
+                self._timed(app.sidebar.selectbox[0].set_value(category).run)
+                yield
+                for _ in range(min(3, len(catalog.tasks(category)))):
+                    task = catalog.get(category, app.session_state["task_index"])
+                    for query in (task.expected, WRONG_QUERY):
+                        self._timed(app.text_area[0].input(query).run)
+                        yield
+                        self._timed(self._button(app, run_label).click().run)
+                        yield
+                    self._timed(self._button(app, next_label).click().run)
+                    yield
+        except Exception as e:
+            self.errors.append(repr(e))
+
+
+def run_worker(students, lessons, rounds, seed, timeout):
+    sys.path.insert(0, ROOT)
+    share_script_cache()
+
+    students = [Student(number, lessons[number % len(lessons)], rounds, seed, timeout)
+                for number in students]
+    sessions = [student.session() for student in students]
+    while sessions:
+        for session in list(sessions):
+            if next(session, StopIteration) is StopIteration:
+                sessions.remove(session)
+
+    return {
+        "latencies": [latency for student in students for latency in student.latencies],
+        "errors": [str(error) for student in students for error in student.errors],
+        # ru_maxrss is in kilobytes on Linux
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+
+
+def previous_result(result):
+    """Last saved run with the same scenario, if any."""
+    scenario = ("students", "rounds", "lesson", "workers")
+    try:
+        with open(RESULTS_FILE, encoding="utf-8") as f:
+            runs = [json.loads(line) for line in f if line.strip()]
+    except OSError:
+        return None
+    matching = [run for run in runs if all(run.get(key) == result[key] for key in scenario)]
+    return matching[-1] if matching else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--students", type=int, default=20)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--rounds", type=int, default=3, help="task types visited per student")
+    parser.add_argument("--lesson", choices=["basics", "complex", "both"], default="both")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--timeout", type=float, default=60, help="seconds allowed per rerun")
+    parser.add_argument("--no-save", action="store_true", help="do not append to the results file")
+    args = parser.parse_args()
+
+    # Keep benchmark submissions out of the real log
+    scratch = tempfile.mkdtemp(prefix="sql-trainer-bench-")
+    os.environ.setdefault("SQL_TRAINER_SUBMISSIONS_DB", os.path.join(scratch, "submissions.db"))
+    os.environ.setdefault("SQL_TRAINER_PROGRESS_DB", os.path.join(scratch, "progress.db"))
+
+    lessons = list(PAGES) if args.lesson == "both" else [args.lesson]
+    workers = max(1, min(args.workers, args.students))
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(run_worker, range(worker, args.students, workers), lessons,
+                               args.rounds, args.seed, args.timeout)
+                   for worker in range(workers)]
+        outcomes = [future.result() for future in futures]
+    elapsed = time.perf_counter() - started
+
+    latencies = [latency for outcome in outcomes for latency in outcome["latencies"]]
+    errors = [error for outcome in outcomes for error in outcome["errors"]]
+    result = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "revision": git_revision(),
+        "students": args.students,
+        "rounds": args.rounds,
+        "lesson": args.lesson,
+        "workers": workers,
+        "reruns": len(latencies),
+        "errors": len(errors),
+        "p50_ms": round(percentile(latencies, 0.50), 1),
+        "p95_ms": round(percentile(latencies, 0.95), 1),
+        "p99_ms": round(percentile(latencies, 0.99), 1),
+        "throughput_rps": round(len(latencies) / elapsed, 1),
+        "peak_rss_mb": round(max(outcome["peak_rss_mb"] for outcome in outcomes), 1),
+    }
+
+    print(json.dumps(result, indent=2))
+    previous = previous_result(result)
+    if previous:
+        for metric in ("p50_ms", "p95_ms", "p99_ms", "throughput_rps", "peak_rss_mb"):
+            change = (result[metric] - previous[metric]) / previous[metric] * 100 if previous[metric] else 0
+            print(f"{metric}: {previous[metric]} -> {result[metric]} ({change:+.0f}% vs {previous['revision']})")
+    for error in sorted(set(errors))[:5]:
+        print(f"error: {error}", file=sys.stderr)
+
+    if not args.no_save:
+        os.makedirs(os.path.dirname(RESULTS_FILE), exist_ok=True)
+        with open(RESULTS_FILE, "a", encoding="utf-8") as f:
+            f.write(json.dumps(result) + "\n")
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
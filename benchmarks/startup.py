@@ -0,0 +1,178 @@
+"""Cold-start benchmark: import time and time to first render.
+
+Every sample runs in a fresh interpreter with empty on-disk caches, like
+the first request after a container restart. Two things are measured:
+
+- imports: ``python -X importtime`` over the modules ``program.py`` and the
+  lesson pages import, reported per top-level package;
+- first render: ``AppTest`` runs of the landing page (which validates the
+  task catalogs), each lesson page, and the first ER diagram.
+
+The median of ``--repeat`` samples is printed, compared with the previous
+run and appended to ``benchmarks/results/startup.jsonl``.
+
+    python benchmarks/startup.py --repeat 5
+"""
+import argparse
+import ast
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from load_test import ROOT, git_revision
+
+RESULTS_FILE = os.path.join(ROOT, "benchmarks", "results", "startup.jsonl")
+ENTRY_POINTS = ["program.py", "pages/1_Basics_and_Filters.py", "pages/2_Complex_Queries.py"]
+# Only loaded on demand; importing them at startup is a regression
+LAZY_MODULES = ("graphviz", "core.regrade")
+
+
+def entry_point_imports():
+    """Top-level modules imported by the app's scripts, in first-seen order."""
+    modules = []
+    for script in ENTRY_POINTS:
+        with open(os.path.join(ROOT, script), encoding="utf-8") as f:
+            tree = ast.parse(f.read())
+        for node in tree.body:
+            if isinstance(node, ast.Import):
+                names = [alias.name for alias in node.names]
+            elif isinstance(node, ast.ImportFrom) and node.module:
+                names = [node.module]
+            else:
+                continue
+            modules += [name for name in names if name not in modules]
+    return modules
+
+
+def measure_imports(env):
+    """Import time in ms per top-level package (self time, so nothing is counted twice)."""
+    statement = "; ".join(f"import {module}" for module in entry_point_imports())
+    completed = subprocess.run([sys.executable, "-X", "importtime", "-c", statement], cwd=ROOT,
+                               env=env, capture_output=True, text=True, check=True)
+    packages = {}
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or line.count("|") != 2:
+            continue
+        own, _, name = line[len("import time:"):].split("|")
+        if not own.strip().isdigit():
+            continue
+        package = name.strip().split(".")[0]
+        packages[package] = packages.get(package, 0) + int(own) / 1000
+    return packages
+
+
+def probe():
+    """Run inside a fresh interpreter: time the first render of each page."""
+    sys.path.insert(0, ROOT)
+    from streamlit.testing.v1 import AppTest
+
+    timings = {}
+
+    def timed(label, action):
+        started = time.perf_counter()
+        app = action()
+        timings[label] = (time.perf_counter() - started) * 1000
+        if app.exception:
+            raise RuntimeError(f"{label}: {app.exception[0].message}")
+        return app
+
+    def first_run(script):
+        return lambda: AppTest.from_file(os.path.join(ROOT, script), default_timeout=300).run()
+
+    timed("landing_ms", first_run(ENTRY_POINTS[0]))
+    basics = timed("basics_ms", first_run(ENTRY_POINTS[1]))
+    timings["lazy_loaded"] = [module for module in LAZY_MODULES if module in sys.modules]
+    diagram = next(button for button in basics.sidebar.button if "ER Diagram" in button.label)
+    timed("er_diagram_ms", lambda: diagram.click().run())
+    timed("complex_ms", first_run(ENTRY_POINTS[2]))
+    print(json.dumps(timings))
+
+
+def measure_render(env):
+    completed = subprocess.run([sys.executable, os.path.abspath(__file__), "--probe"], cwd=ROOT,
+                               env=env, capture_output=True, text=True)
+    if completed.returncode:
+        raise RuntimeError(completed.stderr.strip().splitlines()[-1])
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def sample_env(scratch):
+    """Environment for one cold sample: empty caches, throwaway submission log."""
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [ROOT, env.get("PYTHONPATH")]))
+    env["SQL_TRAINER_CACHE_DIR"] = os.path.join(scratch, "cache")
+    env["SQL_TRAINER_SUBMISSIONS_DB"] = os.path.join(scratch, "submissions.db")
+    env["SQL_TRAINER_PROGRESS_DB"] = os.path.join(scratch, "progress.db")
+    return env
+
+
+def previous_result(result):
+    """Last saved run with the same scenario, if any."""
+    try:
+        with open(RESULTS_FILE, encoding="utf-8") as f:
+            runs = [json.loads(line) for line in f if line.strip()]
+    except OSError:
+        return None
+    matching = [run for run in runs if run.get("scale") == result["scale"]]
+    return matching[-1] if matching else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=3, help="cold samples to take the median of")
+    parser.add_argument("--no-save", action="store_true", help="do not append to the results file")
+    parser.add_argument("--probe", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.probe:
+        probe()
+        return 0
+
+    imports, renders = [], []
+    for _ in range(args.repeat):
+        with tempfile.TemporaryDirectory(prefix="sql-trainer-startup-") as scratch:
+            env = sample_env(scratch)
+            imports.append(measure_imports(env))
+            renders.append(measure_render(env))
+
+    def median(samples, key):
+        return round(statistics.median(sample.get(key, 0) for sample in samples), 1)
+
+    packages = sorted({package for sample in imports for package in sample},
+                      key=lambda package: -median(imports, package))
+    result = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "revision": git_revision(),
+        "scale": int(os.environ.get("SQL_TRAINER_SCALE", "0")),
+        "repeat": args.repeat,
+        "import_ms": round(statistics.median(sum(sample.values()) for sample in imports), 1),
+        "import_breakdown_ms": {package: median(imports, package) for package in packages[:8]},
+        "landing_ms": median(renders, "landing_ms"),
+        "basics_ms": median(renders, "basics_ms"),
+        "complex_ms": median(renders, "complex_ms"),
+        "er_diagram_ms": median(renders, "er_diagram_ms"),
+        "eagerly_loaded": renders[-1]["lazy_loaded"],
+    }
+
+    print(json.dumps(result, indent=2))
+    previous = previous_result(result)
+    if previous:
+        for metric in ("import_ms", "landing_ms", "basics_ms", "complex_ms", "er_diagram_ms"):
+            change = (result[metric] - previous[metric]) / previous[metric] * 100 if previous[metric] else 0
+            print(f"{metric}: {previous[metric]} -> {result[metric]} ({change:+.0f}% vs {previous['revision']})")
+    for module in result["eagerly_loaded"]:
+        print(f"warning: {module} is imported before it is needed", file=sys.stderr)
+
+    if not args.no_save:
+        os.makedirs(os.path.dirname(RESULTS_FILE), exist_ok=True)
+        with open(RESULTS_FILE, "a", encoding="utf-8") as f:
+            f.write(json.dumps(result) + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
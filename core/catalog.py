@@ -0,0 +1,132 @@
+"""Task catalogs of the lesson pages, loaded once per process.
+
+Each lesson's tasks live in ``core/tasks/<lesson>.json`` together with the
+name of the dataset they run against. ``get_catalog`` loads the file,
+runs and times every expected query, and raises ``CatalogError`` if any of
+them fails or is too slow, so a broken answer is caught at boot instead of
+in front of a class. Answers cached for the current dataset version (see
+``CACHE_DIR``) are not run again; ``python -m core.catalog`` re-times all
+lessons.
+"""
+import functools
+import json
+import os
+from dataclasses import dataclass
+
+from core import config
+from core.execution import EXPECTED_BUDGET, QueryStats, run_query
+from core.grading import expected_results
+from core.sandbox import open_sandbox
+from core.variants import variant_names
+
+TASKS_DIR = os.path.join(os.path.dirname(__file__), "tasks")
+LESSONS = ("basics", "complex")
+
+
+class CatalogError(Exception):
+    pass
+
+
+@dataclass(frozen=True, slots=True)
+class Task:
+    category: str
+    index: int
+    story: str
+    tip: str
+    task: str
+    expected: str
+    visual: str = None
+
+
+class TaskCatalog:
+    def __init__(self, lesson, dataset, categories):
+        self.lesson = lesson
+        self.dataset = dataset
+        # category -> tuple of Task, in file order
+        self._categories = categories
+
+    @property
+    def categories(self):
+        return list(self._categories)
+
+    def tasks(self, category):
+        return self._categories[category]
+
+    def get(self, category, index):
+        return self._categories[category][index]
+
+    def __iter__(self):
+        for tasks in self._categories.values():
+            yield from tasks
+
+
+@functools.lru_cache(maxsize=None)
+def load_catalog(lesson):
+    with open(os.path.join(TASKS_DIR, f"{lesson}.json"), encoding="utf-8") as f:
+        data = json.load(f)
+    categories = {
+        category: tuple(Task(category, index, **task) for index, task in enumerate(tasks))
+        for category, tasks in data["categories"].items()
+    }
+    return TaskCatalog(lesson, data["dataset"], categories)
+
+
+def task_time_limit(rows=config.DATASET_SCALE):
+    """Most ms an expected query may take on a dataset scaled to ``rows`` (0 = the fixtures)."""
+    return config.TASK_MAX_MS * max(1.0, rows / config.TASK_MAX_MS_ROWS)
+
+
+def validate_catalog(catalog, max_ms=None, retime=False):
+    """Check every expected query on the dataset and on each grading variant.
+
+    A result already in the expected-result cache for this dataset version
+    passed before and is not run again unless ``retime``. The other queries
+    run once and are timed, and their results go to the cache, so grading
+    never has to run them again. Returns the run times in ms on the dataset.
+    """
+    max_ms = task_time_limit() if max_ms is None else max_ms
+    timings = {}
+    problems = []
+    for dataset_name in (catalog.dataset, *variant_names(catalog.dataset)):
+        conn = None
+        try:
+            for task in catalog:
+                if not retime and expected_results.cached(dataset_name, task.expected) is not None:
+                    continue
+                if conn is None:
+                    conn = open_sandbox(dataset_name)
+                label = f"{task.category} #{task.index + 1}"
+                if dataset_name != catalog.dataset:
+                    label += f" ({dataset_name})"
+                stats = QueryStats()
+                try:
+                    frame = run_query(conn, task.expected, EXPECTED_BUDGET, stats)
+                except Exception as e:
+                    problems.append(f"{label}: {e}")
+                    continue
+                if stats.elapsed_ms > max_ms:
+                    problems.append(f"{label}: took {stats.elapsed_ms:.0f} ms (limit {max_ms:.0f} ms)")
+                if dataset_name == catalog.dataset:
+                    timings[label] = stats.elapsed_ms
+                expected_results.put(dataset_name, task.expected, frame)
+        finally:
+            if conn is not None:
+                conn.close()
+
+    if problems:
+        raise CatalogError(f"Invalid expected queries in the '{catalog.lesson}' catalog:\n" + "\n".join(problems))
+    return timings
+
+
+@functools.lru_cache(maxsize=None)
+def get_catalog(lesson):
+    catalog = load_catalog(lesson)
+    validate_catalog(catalog)
+    return catalog
+
+
+if __name__ == "__main__":
+    for lesson in LESSONS:
+        timings = validate_catalog(load_catalog(lesson), retime=True)
+        slowest = max(timings, key=timings.get)
+        print(f"{lesson}: {len(timings)} tasks OK, slowest {slowest} ({timings[slowest]:.1f} ms)")
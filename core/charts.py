@@ -0,0 +1,73 @@
+"""Turn a query result into a small frame that is cheap to chart.
+
+Key columns (``id``, ``*_id``) are left out, and results with more rows
+than ``max_points`` are reduced with vectorized pandas operations before
+anything reaches the browser:
+
+- with a text column, rows are averaged per label and the largest
+  ``max_points`` labels are kept;
+- otherwise consecutive rows are averaged into ``max_points`` bins.
+"""
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from core import config
+
+# Value columns drawn at most; more would not be readable anyway
+MAX_SERIES = 8
+
+
+@dataclass
+class ChartData:
+    frame: pd.DataFrame
+    kind: str  # "bar" or "line"
+    note: str = ""
+
+
+def is_key_column(name):
+    name = str(name).lower()
+    return name == "id" or name.endswith("_id")
+
+
+def value_columns(df):
+    numeric = df.select_dtypes(include="number").columns
+    return [column for column in numeric if not is_key_column(column)][:MAX_SERIES]
+
+
+def label_column(df):
+    for column in df.select_dtypes(include=["object", "string"]).columns:
+        if not is_key_column(column):
+            return column
+    return None
+
+
+def chart_data(df, max_points=None):
+    """Pick and reduce the chartable part of ``df``; None if nothing to chart."""
+    max_points = max_points or config.CHART_MAX_POINTS
+    values = value_columns(df)
+    if not values or df.empty:
+        return None
+    label = label_column(df)
+
+    if len(df) <= max_points:
+        frame = df[values]
+        if label is not None and df[label].is_unique:
+            frame = frame.set_axis(df[label])
+        return ChartData(frame, "bar")
+
+    if label is not None:
+        means = df.groupby(label, sort=False)[values].mean()
+        if len(means) <= max_points:
+            return ChartData(means, "bar", f"Average per {label} over {len(df):,} rows.")
+        top = means.nlargest(max_points, values[0])
+        return ChartData(top, "bar", f"Average per {label}: top {max_points:,} of {len(means):,} "
+                                     f"by {values[0]}, over {len(df):,} rows.")
+
+    step = -(-len(df) // max_points)
+    bins = np.arange(len(df)) // step
+    frame = df[values].groupby(bins).mean()
+    frame.index = frame.index * step
+    frame.index.name = "row"
+    return ChartData(frame, "line", f"Average of every {step:,} rows ({len(df):,} rows in total).")
@@ -0,0 +1,137 @@
+"""Result comparison used to grade student queries.
+
+Both frames are normalized column by column and reduced to one 64-bit hash
+per row with ``pd.util.hash_pandas_object``. Ordered comparison checks the
+hash sequences element-wise; unordered comparison compares the hashes as
+multisets via ``value_counts``. Both are linear in the number of rows and
+never sort or compare mixed-type values directly.
+"""
+import re
+from dataclasses import dataclass, replace
+
+import numpy as np
+import pandas as pd
+
+NULL_TOKEN = "\0NULL"
+
+
+@dataclass(frozen=True)
+class ComparisonRules:
+    ignore_column_order: bool = True
+    ignore_row_order: bool = True
+    # Floats are compared after rounding to this step, e.g. for AVG() results
+    float_tolerance: float = 1e-6
+    # Compare 5, 5.0 and '5' as equal values
+    coerce_types: bool = True
+    # Compare column names ignoring case and whitespace, e.g. COUNT(*) and count( * )
+    normalize_column_names: bool = True
+
+
+DEFAULT_RULES = ComparisonRules()
+
+ORDER_BY = re.compile(r"\border\s+by\b", re.IGNORECASE)
+WHITESPACE = re.compile(r"\s+")
+
+
+def rules_for(expected_sql, rules=DEFAULT_RULES):
+    """Row order only matters when the expected query sorts its result."""
+    return replace(rules, ignore_row_order=not ORDER_BY.search(expected_sql))
+
+
+def _column_names(frame, rules):
+    names = [str(name) for name in frame.columns]
+    if rules.normalize_column_names:
+        return [WHITESPACE.sub("", name).lower() for name in names]
+    return names
+
+
+def _column_order(frame, names, rules):
+    positions = range(len(names))
+    if not rules.ignore_column_order:
+        return list(positions)
+    if len(set(names)) == len(names):
+        return sorted(positions, key=names.__getitem__)
+    # Columns with the same name, e.g. e.name and d.name, are told apart by their values
+    return sorted(positions, key=lambda i: (names[i], *_signature(frame.iloc[:, i], rules)))
+
+
+def _signature(column, rules):
+    """(is text, hash) of a column's values, equal for columns the comparison treats as equal."""
+    if rules.coerce_types and not _is_number(column):
+        column = _as_number(column)
+    hashes = pd.util.hash_pandas_object(_normalize(column, rules), index=False, categorize=False).to_numpy()
+    if not rules.ignore_row_order:
+        # Weight by position so the same values in another order differ
+        hashes = hashes * (2 * np.arange(len(hashes), dtype="uint64") + 1)
+    return not _is_number(column), int(hashes.sum())
+
+
+def _is_number(column):
+    return pd.api.types.is_bool_dtype(column) or pd.api.types.is_numeric_dtype(column)
+
+
+def _as_number(column):
+    # Only used when the other side is numeric, so failures are the rare case
+    as_number = pd.to_numeric(column, errors="coerce")
+    if as_number.notna().sum() == column.notna().sum():
+        return as_number
+    return column
+
+
+def _normalize(column, rules):
+    if _is_number(column):
+        if rules.coerce_types or pd.api.types.is_float_dtype(column):
+            values = column.to_numpy(dtype="float64", na_value=np.nan)
+            if rules.float_tolerance:
+                # Adding 0.0 turns -0.0 into 0.0, which hashes differently
+                values = np.round(values / rules.float_tolerance) + 0.0
+            return pd.Series(values, copy=False)
+        return column.reset_index(drop=True)
+
+    return column.astype("string").fillna(NULL_TOKEN).reset_index(drop=True)
+
+
+def _row_hashes(columns):
+    frame = pd.DataFrame(dict(enumerate(columns)))
+    return pd.util.hash_pandas_object(frame, index=False, categorize=False).to_numpy()
+
+
+def results_match(actual, expected, rules=DEFAULT_RULES):
+    if actual.shape != expected.shape:
+        return False
+
+    actual_names = _column_names(actual, rules)
+    expected_names = _column_names(expected, rules)
+    actual_order = _column_order(actual, actual_names, rules)
+    expected_order = _column_order(expected, expected_names, rules)
+    if [actual_names[i] for i in actual_order] != [expected_names[i] for i in expected_order]:
+        return False
+    if not rules.coerce_types:
+        actual_kinds = [actual.dtypes.iloc[i].kind for i in actual_order]
+        if actual_kinds != [expected.dtypes.iloc[i].kind for i in expected_order]:
+            return False
+    if len(actual) == 0:
+        return True
+
+    actual_columns, expected_columns = [], []
+    for actual_position, expected_position in zip(actual_order, expected_order):
+        actual_column = actual.iloc[:, actual_position]
+        expected_column = expected.iloc[:, expected_position]
+        if rules.coerce_types and _is_number(actual_column) != _is_number(expected_column):
+            if _is_number(actual_column):
+                expected_column = _as_number(expected_column)
+            else:
+                actual_column = _as_number(actual_column)
+        actual_columns.append(_normalize(actual_column, rules))
+        expected_columns.append(_normalize(expected_column, rules))
+
+    actual_hashes = _row_hashes(actual_columns)
+    expected_hashes = _row_hashes(expected_columns)
+    if not rules.ignore_row_order:
+        return bool(np.array_equal(actual_hashes, expected_hashes))
+
+    actual_counts = pd.Series(actual_hashes).value_counts()
+    expected_counts = pd.Series(expected_hashes).value_counts()
+    if len(actual_counts) != len(expected_counts):
+        return False
+    return bool(actual_counts.reindex(expected_counts.index).eq(expected_counts).all())
@@ -0,0 +1,73 @@
+"""Runtime settings, read from environment variables."""
+import os
+
+# Directory for on-disk caches; leave unset to keep everything in memory
+CACHE_DIR = os.environ.get("SQL_TRAINER_CACHE_DIR") or None
+
+# --- Budget for a single student query ---
+QUERY_TIME_LIMIT = float(os.environ.get("SQL_TRAINER_QUERY_TIME_LIMIT", "2.0"))  # seconds
+QUERY_MAX_VM_STEPS = int(os.environ.get("SQL_TRAINER_QUERY_MAX_VM_STEPS", "50000000"))
+QUERY_MAX_ROWS = int(os.environ.get("SQL_TRAINER_QUERY_MAX_ROWS", "100000"))
+QUERY_MAX_BYTES = int(os.environ.get("SQL_TRAINER_QUERY_MAX_MB", "64")) * 1024 * 1024
+
+# Rows shown per page in the result viewer
+RESULT_PAGE_SIZE = int(os.environ.get("SQL_TRAINER_RESULT_PAGE_SIZE", "50"))
+
+# SQLite file holding the submission log of both lesson pages
+SUBMISSIONS_DB = os.environ.get("SQL_TRAINER_SUBMISSIONS_DB", "submissions.db")
+# Closed days of the submission log are compacted into Parquet files here
+SUBMISSIONS_SEGMENTS = os.environ.get("SQL_TRAINER_SUBMISSIONS_SEGMENTS") or f"{SUBMISSIONS_DB}.segments"
+# How often the submission writer compacts closed days (seconds, 0 = never)
+SUBMISSIONS_COMPACT_INTERVAL = float(os.environ.get("SQL_TRAINER_SUBMISSIONS_COMPACT_INTERVAL", "3600"))
+# Submissions shown per page in the teacher's submission log
+SUBMISSIONS_PAGE_SIZE = int(os.environ.get("SQL_TRAINER_SUBMISSIONS_PAGE_SIZE", "500"))
+# SQLite file with every student's score and solved tasks, shared by all server replicas
+PROGRESS_DB = os.environ.get("SQL_TRAINER_PROGRESS_DB", "progress.db")
+# Students listed on the leaderboard, and how often an open leaderboard refreshes (seconds, 0 = off)
+LEADERBOARD_SIZE = int(os.environ.get("SQL_TRAINER_LEADERBOARD_SIZE", "10"))
+LEADERBOARD_REFRESH = float(os.environ.get("SQL_TRAINER_LEADERBOARD_REFRESH", "15"))
+# Largest download the teacher dashboard offers; Streamlit keeps the whole file in memory
+EXPORT_MAX_MB = int(os.environ.get("SQL_TRAINER_EXPORT_MAX_MB", "100"))
+# Legacy CSV log, imported once when the submission database is created
+LEGACY_SUBMISSIONS_CSV = "submissions.csv"
+
+# Scale the lesson datasets up to roughly this many rows (0 = hand-written fixtures)
+DATASET_SCALE = int(os.environ.get("SQL_TRAINER_SCALE", "0"))
+DATASET_SEED = int(os.environ.get("SQL_TRAINER_SEED", "0"))
+# Generated dataset files are cached here
+DATASET_DIR = os.path.join(CACHE_DIR or ".cache", "datasets")
+
+# Expected task queries slower than this fail catalog validation at startup
+TASK_MAX_MS = float(os.environ.get("SQL_TRAINER_TASK_MAX_MS", "500"))
+# ... on datasets of up to this many rows; larger scaled datasets get a proportionally higher limit
+TASK_MAX_MS_ROWS = int(os.environ.get("SQL_TRAINER_TASK_MAX_MS_ROWS", "10000"))
+
+# --- Budget for the tasks' own expected queries ---
+# They are trusted and must cover the whole dataset, so this is only a safety net
+EXPECTED_TIME_LIMIT = float(os.environ.get("SQL_TRAINER_EXPECTED_TIME_LIMIT", "60"))  # seconds
+EXPECTED_MAX_VM_STEPS = int(os.environ.get("SQL_TRAINER_EXPECTED_MAX_VM_STEPS", "10000000000"))
+EXPECTED_MAX_ROWS = int(os.environ.get("SQL_TRAINER_EXPECTED_MAX_ROWS", "10000000"))
+EXPECTED_MAX_BYTES = int(os.environ.get("SQL_TRAINER_EXPECTED_MAX_MB", "4096")) * 1024 * 1024
+
+# Worker processes for running queries off the script thread (0 = run inline)
+QUERY_WORKERS = int(os.environ.get("SQL_TRAINER_QUERY_WORKERS", "0"))
+
+# Hidden dataset variants a correct answer must also pass on (0 = grade on the dataset only);
+# on by default only with query workers, which check them side by side
+GRADING_VARIANTS = int(os.environ.get("SQL_TRAINER_GRADING_VARIANTS", "3" if QUERY_WORKERS else "0"))
+
+# Most points (bars or line samples) sent to the browser for one result chart
+CHART_MAX_POINTS = int(os.environ.get("SQL_TRAINER_CHART_MAX_POINTS", "500"))
+
+# --- Per-session sandboxes ---
+# Memory a session's sandbox may grow by through student writes, on top of the dataset
+SANDBOX_EXTRA_MB = int(os.environ.get("SQL_TRAINER_SANDBOX_EXTRA_MB", "16"))
+# Process-wide SQLite soft heap limit (0 = no limit)
+SANDBOX_HEAP_LIMIT_MB = int(os.environ.get("SQL_TRAINER_SANDBOX_HEAP_LIMIT_MB", "512"))
+# Sandboxes kept alive; the least recently used beyond this are dropped
+SANDBOX_MAX_SESSIONS = int(os.environ.get("SQL_TRAINER_SANDBOX_MAX_SESSIONS", "200"))
+# Sandboxes idle longer than this are dropped (seconds)
+SANDBOX_IDLE_TIMEOUT = float(os.environ.get("SQL_TRAINER_SANDBOX_IDLE_TIMEOUT", "1800"))
+
+# Memory for results shared between identical student queries (0 = off)
+RESULT_CACHE_MB = int(os.environ.get("SQL_TRAINER_RESULT_CACHE_MB", "64"))
@@ -0,0 +1,232 @@
+"""Deterministic large-scale versions of the lesson datasets.
+
+The hand-written fixture rows are loaded first, so their ids and every
+literal the tasks rely on ('Anna Kovacs', department 2 = IT, ...) stay
+valid. Synthetic rows are then appended with numpy, using skewed
+distributions (Zipf-like department and product popularity, log-normal
+salaries and amounts) and foreign keys drawn only from existing ids.
+
+Foreign key and name columns are indexed, as a real database of that size
+would be.
+Each (dataset, rows, seed) combination is built once into a SQLite file
+under ``DATASET_DIR`` and reused afterwards.
+"""
+import functools
+import hashlib
+import os
+import sqlite3
+import threading
+
+import numpy as np
+
+from core import config
+from core.datasets import DATASETS
+
+# Bump when the generated data changes, so cached files are rebuilt
+GENERATOR_VERSION = 3
+INSERT_CHUNK = 50_000
+
+FIRST_NAMES = np.array([
+    "Adam", "Anna", "Balazs", "Bence", "Dora", "Eszter", "Eva", "Gabor", "Istvan", "Julia",
+    "Katalin", "Laszlo", "Lajos", "Marta", "Marton", "Nora", "Peter", "Reka", "Robert", "Zsofia",
+])
+LAST_NAMES = np.array([
+    "Balogh", "Farkas", "Horvath", "Kiss", "Kovacs", "Lakatos", "Molnar", "Nagy", "Nemeth", "Novak",
+    "Olah", "Papp", "Simon", "Szabo", "Szalai", "Takacs", "Toth", "Varga", "Vass", "Vincze",
+])
+COUNTRIES = np.array(["Hungary", "Germany", "Austria", "Poland", "Czechia", "Slovakia", "Romania",
+                      "France", "Italy", "Netherlands"])
+INDUSTRIES = np.array(["IT", "Marketing", "Finance", "Retail", "Manufacturing", "Logistics", "Healthcare"])
+STATUSES = np.array(["Done", "In Progress", "Not Started", "Blocked"])
+STATUS_WEIGHTS = [0.55, 0.3, 0.1, 0.05]
+
+
+# --- Vectorized column generators ---
+def _zipf_ids(rng, count, size, exponent=1.1):
+    """Ids 1..count where a few ids are very popular and most are rare."""
+    weights = np.arange(1, count + 1, dtype="float64") ** -exponent
+    popularity = rng.permutation(count)
+    return popularity[rng.choice(count, size=size, p=weights / weights.sum())] + 1
+
+
+def _weighted(rng, values, size, exponent=1.0):
+    weights = np.arange(1, len(values) + 1, dtype="float64") ** -exponent
+    return values[rng.choice(len(values), size=size, p=weights / weights.sum())]
+
+
+def _names(rng, size):
+    first = rng.choice(FIRST_NAMES, size=size)
+    last = rng.choice(LAST_NAMES, size=size)
+    return np.char.add(np.char.add(first, " "), last)
+
+
+def _labels(prefix, first_id, size):
+    return np.char.add(prefix, np.arange(first_id, first_id + size).astype(str))
+
+
+def _dates(rng, start, end, size):
+    start = np.datetime64(start, "D")
+    span = (np.datetime64(end, "D") - start).astype(int)
+    return (start + rng.integers(0, span, size=size)).astype(str)
+
+
+def _rounded(values, step):
+    return (np.round(values / step) * step).astype("int64")
+
+
+def _insert(conn, table, columns):
+    names = list(columns)
+    statement = f"INSERT INTO {table} ({', '.join(names)}) VALUES ({', '.join('?' * len(names))})"
+    arrays = list(columns.values())
+    for start in range(0, len(arrays[0]), INSERT_CHUNK):
+        chunk = [array[start:start + INSERT_CHUNK].tolist() for array in arrays]
+        conn.executemany(statement, zip(*chunk))
+
+
+# --- Per-dataset table generators ---
+def _generate_basics(conn, rng, rows, existing):
+    departments = max(existing["departments"], rows // 2000)
+    employees = max(existing["employees"], rows // 4)
+
+    new = departments - existing["departments"]
+    _insert(conn, "departments", {
+        "name": _labels("Department ", existing["departments"] + 1, new),
+        "manager": _names(rng, new),
+    })
+    new = employees - existing["employees"]
+    _insert(conn, "employees", {
+        "name": _names(rng, new),
+        "department_id": _zipf_ids(rng, departments, new),
+        "salary": _rounded(rng.lognormal(np.log(520000), 0.35, new), 1000),
+        "hire_date": _dates(rng, "2010-01-01", "2025-01-01", new),
+    })
+    new = max(0, rows * 3 // 5 - existing["sales"])
+    products = _labels("Product ", 1, 200)
+    _insert(conn, "sales", {
+        "employee_id": _zipf_ids(rng, employees, new, exponent=0.8),
+        "product": _weighted(rng, products, new),
+        "amount": _rounded(rng.lognormal(np.log(15000), 0.6, new), 100),
+        "sale_date": _dates(rng, "2020-01-01", "2025-01-01", new),
+    })
+    new = max(0, rows * 3 // 20 - existing["customers"])
+    _insert(conn, "customers", {
+        "name": _labels("Customer ", existing["customers"] + 1, new),
+        "country": _weighted(rng, COUNTRIES, new),
+        "industry": _weighted(rng, INDUSTRIES, new, exponent=0.7),
+    })
+
+
+def _generate_complex(conn, rng, rows, existing):
+    departments = max(existing["departments"], rows // 2000)
+    employees = max(existing["employees"], rows // 4)
+    projects = max(existing["projects"], rows // 20)
+
+    new = departments - existing["departments"]
+    _insert(conn, "departments", {
+        "name": _labels("Department ", existing["departments"] + 1, new),
+        "manager": _names(rng, new),
+    })
+    new = employees - existing["employees"]
+    _insert(conn, "employees", {
+        "name": _names(rng, new),
+        "department_id": _zipf_ids(rng, departments, new),
+        "salary": _rounded(rng.lognormal(np.log(620000), 0.3, new), 1000),
+        "hire_date": _dates(rng, "2010-01-01", "2025-01-01", new),
+    })
+    new = projects - existing["projects"]
+    _insert(conn, "projects", {
+        "name": _labels("Project ", existing["projects"] + 1, new),
+        "budget": _rounded(rng.lognormal(np.log(900000), 0.8, new), 10000),
+        "department_id": _zipf_ids(rng, departments, new),
+    })
+    new = max(0, rows * 13 // 20 - existing["tasks"])
+    _insert(conn, "tasks", {
+        "project_id": _zipf_ids(rng, projects, new, exponent=0.9),
+        "assigned_to": rng.integers(1, employees + 1, size=new),
+        "hours": np.maximum(1, rng.gamma(2.0, 20.0, new)).astype("int64"),
+        "status": rng.choice(STATUSES, size=new, p=STATUS_WEIGHTS),
+    })
+
+
+GENERATORS = {
+    "basics": _generate_basics,
+    "complex": _generate_complex,
+}
+
+
+def _create_indexes(conn):
+    """Index foreign keys and names, so joins, correlated subqueries and the tasks' lookups by name
+    (``WHERE name = 'IT'``) stay index searches at any scale."""
+    tables = [name for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table' "
+                                               "AND name NOT LIKE 'sqlite_%'").fetchall()]
+    for table in tables:
+        columns = [row[3] for row in conn.execute(f"PRAGMA foreign_key_list({table})").fetchall()]
+        columns += [row[1] for row in conn.execute(f"PRAGMA table_info({table})") if row[1] == "name"]
+        for column in columns:
+            conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_{column} ON {table} ({column})")
+
+
+def build_file(path, fill):
+    """Create the SQLite file ``path`` with ``fill(conn)``; readers never see it half built."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    conn = sqlite3.connect(tmp_path)
+    try:
+        conn.execute("PRAGMA journal_mode=OFF")
+        conn.execute("PRAGMA synchronous=OFF")
+        fill(conn)
+    finally:
+        conn.close()
+    os.replace(tmp_path, path)
+
+
+def build_database(base, rows, seed, path):
+    """Write the scaled version of ``base`` to a new SQLite file at ``path``."""
+    def fill(conn):
+        base.load(conn)
+        existing = {
+            table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+            for (table,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table' "
+                                         "AND name NOT LIKE 'sqlite_%'").fetchall()
+        }
+        with conn:
+            GENERATORS[base.name](conn, np.random.default_rng(seed), rows, existing)
+            _create_indexes(conn)
+        conn.execute("ANALYZE")
+
+    build_file(path, fill)
+
+
+class ScaledDataset:
+    def __init__(self, base, rows, seed):
+        self.base = base
+        self.name = base.name
+        self.schema = base.schema
+        self.rows = rows
+        self.seed = seed
+
+    @property
+    def version(self):
+        key = f"{self.base.version}:{self.rows}:{self.seed}:{GENERATOR_VERSION}"
+        return hashlib.sha256(key.encode("utf-8")).hexdigest()[:12]
+
+    @property
+    def path(self):
+        return os.path.join(config.DATASET_DIR, f"{self.name}-{self.rows}-s{self.seed}-{self.version}.sqlite")
+
+    def ensure_file(self):
+        if not os.path.isfile(self.path):
+            build_database(self.base, self.rows, self.seed, self.path)
+        return self.path
+
+    def load(self, conn):
+        source = sqlite3.connect(self.ensure_file())
+        try:
+            source.backup(conn)
+        finally:
+            source.close()
+
+
+@functools.lru_cache(maxsize=None)
+def scaled_dataset(name, rows, seed=0):
+    return ScaledDataset(DATASETS[name], rows, seed)
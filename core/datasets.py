@@ -0,0 +1,155 @@
+"""Fixture datasets used by the lesson pages."""
+import hashlib
+
+from core import config
+
+
+class Dataset:
+    def __init__(self, name, schema, inserts):
+        self.name = name
+        self.schema = schema
+        # (insert statement, rows) pairs, loaded in order
+        self.inserts = inserts
+
+    @property
+    def version(self):
+        digest = hashlib.sha256(self.schema.encode("utf-8"))
+        for statement, rows in self.inserts:
+            digest.update(statement.encode("utf-8"))
+            digest.update(repr(rows).encode("utf-8"))
+        return digest.hexdigest()[:12]
+
+    def load(self, conn):
+        conn.executescript(self.schema)
+        for statement, rows in self.inserts:
+            conn.executemany(statement, rows)
+        conn.commit()
+
+
+# --- Lesson 1: Basics and Filters ---
+BASICS = Dataset("basics", """
+CREATE TABLE employees (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT,
+    department_id INTEGER,
+    salary INTEGER,
+    hire_date DATE,
+    FOREIGN KEY(department_id) REFERENCES departments(id)
+);
+CREATE TABLE departments (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT,
+    manager TEXT
+);
+CREATE TABLE sales (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    employee_id INTEGER,
+    product TEXT,
+    amount INTEGER,
+    sale_date DATE,
+    FOREIGN KEY(employee_id) REFERENCES employees(id)
+);
+CREATE TABLE customers (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT,
+    country TEXT,
+    industry TEXT
+);
+""", [
+    ("INSERT INTO departments (name, manager) VALUES (?, ?)", [
+        ("HR", "Anna Kovacs"),
+        ("IT", "Peter Nagy"),
+        ("Marketing", "Eszter Toth")
+    ]),
+    ("INSERT INTO employees (name, department_id, salary, hire_date) VALUES (?, ?, ?, ?)", [
+        ("Anna Kovacs", 1, 400000, "2020-02-10"),
+        ("Peter Nagy", 2, 650000, "2018-05-03"),
+        ("Eszter Toth", 3, 520000, "2021-11-11"),
+        ("Marton Szabo", 2, 720000, "2019-09-21"),
+        ("Julia Farkas", 1, 450000, "2022-03-05")
+    ]),
+    ("INSERT INTO sales (employee_id, product, amount, sale_date) VALUES (?, ?, ?, ?)", [
+        (2, "Product A", 10000, "2023-01-10"),
+        (3, "Product B", 15000, "2023-01-12"),
+        (4, "Product A", 20000, "2023-01-15")
+    ]),
+    ("INSERT INTO customers (name, country, industry) VALUES (?, ?, ?)", [
+        ("Acme Corp", "Hungary", "IT"),
+        ("Beta Ltd", "Germany", "Marketing")
+    ]),
+])
+
+# --- Lesson 2: Complex Queries ---
+COMPLEX = Dataset("complex", """
+CREATE TABLE departments (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT,
+    manager TEXT
+);
+CREATE TABLE employees (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT,
+    department_id INTEGER,
+    salary INTEGER,
+    hire_date DATE,
+    FOREIGN KEY(department_id) REFERENCES departments(id)
+);
+CREATE TABLE projects (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT,
+    budget INTEGER,
+    department_id INTEGER,
+    FOREIGN KEY(department_id) REFERENCES departments(id)
+);
+CREATE TABLE tasks (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    project_id INTEGER,
+    assigned_to INTEGER,
+    hours INTEGER,
+    status TEXT,
+    FOREIGN KEY(project_id) REFERENCES projects(id),
+    FOREIGN KEY(assigned_to) REFERENCES employees(id)
+);
+""", [
+    ("INSERT INTO departments (name, manager) VALUES (?, ?)", [
+        ("IT", "Peter Nagy"), ("HR", "Anna Kovacs"), ("Marketing", "Eszter Toth"),
+        ("Finance", "Gabor Kiss"), ("Sales", "Marta Novak")
+    ]),
+    ("INSERT INTO employees (name, department_id, salary, hire_date) VALUES (?, ?, ?, ?)", [
+        ("Adam Kiss", 1, 800000, "2020-01-10"),
+        ("Julia Farkas", 2, 500000, "2021-06-03"),
+        ("Robert Toth", 3, 450000, "2019-11-17"),
+        ("Eva Horvath", 1, 750000, "2022-02-12"),
+        ("Lajos Szabo", 4, 600000, "2018-09-01"),
+        ("Marta Nagy", 5, 700000, "2019-04-21")
+    ]),
+    ("INSERT INTO projects (name, budget, department_id) VALUES (?, ?, ?)", [
+        ("Website Redesign", 1200000, 1),
+        ("Recruitment Drive", 400000, 2),
+        ("Ad Campaign", 900000, 3),
+        ("ERP Upgrade", 2000000, 4),
+        ("Sales Blitz", 750000, 5)
+    ]),
+    ("INSERT INTO tasks (project_id, assigned_to, hours, status) VALUES (?, ?, ?, ?)", [
+        (1, 1, 50, "Done"), (1, 1, 30, "In Progress"),
+        (2, 2, 25, "Done"), (3, 3, 40, "In Progress"),
+        (4, 4, 100, "Done"), (5, 6, 80, "Done")
+    ]),
+])
+
+DATASETS = {dataset.name: dataset for dataset in (BASICS, COMPLEX)}
+
+
+def get_dataset(name):
+    """Dataset served for ``name``, scaled up when SQL_TRAINER_SCALE is set.
+
+    ``<dataset>~<seed>`` names a hidden grading variant (see ``core.variants``).
+    """
+    base_name, _, seed = name.partition("~")
+    if seed:
+        from core.variants import variant_dataset
+        return variant_dataset(base_name, int(seed))
+    if config.DATASET_SCALE:
+        from core.datagen import scaled_dataset
+        return scaled_dataset(name, config.DATASET_SCALE, config.DATASET_SEED)
+    return DATASETS[name]
@@ -0,0 +1,193 @@
+"""Run SQL against a sandbox under a time, VM-step, row and memory budget.
+
+The time and step limits are enforced from SQLite's progress handler, which
+aborts the running statement; the row and memory limits are checked while
+fetching, so a huge result is never fully materialized. The result viewer
+uses ``fetch_page`` and ``count_rows`` to page through results of any size.
+"""
+import contextlib
+import sys
+import time
+from dataclasses import dataclass
+
+import pandas as pd
+
+from core import config
+
+# SQLite VM instructions between two progress handler calls
+PROGRESS_INTERVAL = 100
+FETCH_SIZE = 1000
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+@dataclass(frozen=True)
+class QueryBudget:
+    time_limit: float = config.QUERY_TIME_LIMIT
+    max_vm_steps: int = config.QUERY_MAX_VM_STEPS
+    max_rows: int = config.QUERY_MAX_ROWS
+    max_bytes: int = config.QUERY_MAX_BYTES
+
+    def for_rows(self, rows):
+        """This budget with room for ``rows`` result rows; past ``max_rows`` every limit grows in proportion."""
+        if rows <= self.max_rows:
+            return self
+        factor = rows / self.max_rows
+        return QueryBudget(self.time_limit * factor, int(self.max_vm_steps * factor), rows,
+                           int(self.max_bytes * factor))
+
+
+DEFAULT_BUDGET = QueryBudget()
+# For the tasks' expected queries, which run on the whole dataset whatever its scale
+EXPECTED_BUDGET = QueryBudget(config.EXPECTED_TIME_LIMIT, config.EXPECTED_MAX_VM_STEPS,
+                              config.EXPECTED_MAX_ROWS, config.EXPECTED_MAX_BYTES)
+
+
+@dataclass
+class QueryStats:
+    elapsed_ms: float = 0.0
+    rows: int = 0
+    # Counted in steps of PROGRESS_INTERVAL, so accurate to about a hundred
+    vm_steps: int = 0
+    plan: str = ""
+    # Served from the shared result cache; the other numbers are from the original run
+    cached: bool = False
+
+    @property
+    def full_scans(self):
+        """Tables the plan reads without an index."""
+        return [line.split()[1] for line in self.plan.splitlines()
+                if line.strip().startswith("SCAN ") and "INDEX" not in line]
+
+
+def _row_size(row):
+    return sys.getsizeof(row) + sum(sys.getsizeof(value) for value in row)
+
+
+@contextlib.contextmanager
+def _enforce(conn, budget, stats=None):
+    """Abort statements on ``conn`` that run past the time or VM-step budget."""
+    started = time.monotonic()
+    deadline = started + budget.time_limit
+    steps = 0
+    exceeded = None
+
+    def on_progress():
+        nonlocal steps, exceeded
+        steps += PROGRESS_INTERVAL
+        if steps > budget.max_vm_steps:
+            exceeded = f"more than {budget.max_vm_steps:,} VM steps"
+        elif time.monotonic() > deadline:
+            exceeded = f"more than {budget.time_limit:g} seconds"
+        return exceeded is not None
+
+    conn.set_progress_handler(on_progress, PROGRESS_INTERVAL)
+    try:
+        yield
+    except QueryBudgetExceeded:
+        raise
+    except Exception as e:
+        if exceeded is not None:
+            raise QueryBudgetExceeded(f"Query exceeded budget: {exceeded}.") from e
+        raise
+    finally:
+        conn.set_progress_handler(None, 0)
+        if stats is not None:
+            stats.elapsed_ms = (time.monotonic() - started) * 1000
+            stats.vm_steps = steps
+
+
+def _columns(cursor):
+    return [description[0] for description in cursor.description]
+
+
+def run_query(conn, sql, budget=DEFAULT_BUDGET, stats=None):
+    """Execute ``sql`` on ``conn`` and return the result as a DataFrame.
+
+    Pass a ``QueryStats`` to collect wall time, row count and VM steps.
+    """
+    with _enforce(conn, budget, stats):
+        cursor = conn.execute(sql)
+        if cursor.description is None:
+            return pd.DataFrame()
+        columns = _columns(cursor)
+
+        rows = []
+        size = 0
+        while True:
+            chunk = cursor.fetchmany(FETCH_SIZE)
+            if not chunk:
+                break
+            rows.extend(chunk)
+            if len(rows) > budget.max_rows:
+                raise QueryBudgetExceeded(
+                    f"Query exceeded budget: more than {budget.max_rows:,} rows returned.")
+            size += sum(_row_size(row) for row in chunk)
+            if size > budget.max_bytes:
+                raise QueryBudgetExceeded(
+                    f"Query exceeded budget: result larger than {budget.max_bytes // (1024 * 1024)} MB.")
+
+    if stats is not None:
+        stats.rows = len(rows)
+    return pd.DataFrame.from_records(rows, columns=columns, coerce_float=True)
+
+
+def column_names(conn, sql, budget=DEFAULT_BUDGET):
+    """Names of the columns ``sql`` returns, or None if it returns none."""
+    with _enforce(conn, budget):
+        cursor = conn.execute(sql)
+        return None if cursor.description is None else _columns(cursor)
+
+
+def explain_plan(conn, sql):
+    """``EXPLAIN QUERY PLAN`` output as an indented tree, or "" if unavailable."""
+    try:
+        plan = conn.execute(f"EXPLAIN QUERY PLAN {sql}").fetchall()
+    except Exception:
+        return ""
+    depth = {0: -1}
+    lines = []
+    for node_id, parent_id, _, detail in plan:
+        depth[node_id] = depth.get(parent_id, -1) + 1
+        lines.append("  " * depth[node_id] + detail)
+    return "\n".join(lines)
+
+
+def fetch_page(conn, sql, page=0, page_size=config.RESULT_PAGE_SIZE, budget=DEFAULT_BUDGET):
+    """Return one page of the result as ``(DataFrame, has_more)``.
+
+    Rows before the page are streamed past with ``fetchmany`` and dropped,
+    so at most one chunk is held in memory regardless of the result size.
+    """
+    with _enforce(conn, budget):
+        cursor = conn.execute(sql)
+        if cursor.description is None:
+            return pd.DataFrame(), False
+        columns = _columns(cursor)
+
+        to_skip = page * page_size
+        while to_skip > 0:
+            skipped = len(cursor.fetchmany(min(to_skip, FETCH_SIZE)))
+            if not skipped:
+                break
+            to_skip -= skipped
+        rows = cursor.fetchmany(page_size + 1)
+
+    frame = pd.DataFrame.from_records(rows[:page_size], columns=columns, coerce_float=True)
+    return frame, len(rows) > page_size
+
+
+def count_rows(conn, sql, budget=DEFAULT_BUDGET):
+    """Count the rows ``sql`` returns without keeping them."""
+    with _enforce(conn, budget):
+        cursor = conn.execute(sql)
+        if cursor.description is None:
+            return 0
+        total = 0
+        while True:
+            chunk = cursor.fetchmany(FETCH_SIZE)
+            if not chunk:
+                return total
+            total += len(chunk)
@@ -0,0 +1,314 @@
+"""Run queries in a pool of worker processes instead of the script thread.
+
+Every worker holds a warm, read-only copy of each sandbox dataset, guarded
+like the session sandboxes and replaced if a job ever changed it. Jobs go
+through one shared queue; a dispatcher thread per worker hands them over a
+pipe and waits at most the query's time limit plus a grace period. A worker
+that does not answer in time is killed and replaced, so a hung query costs
+one process restart instead of a blocked session. Results come back as
+Arrow IPC streams, or as pickled frames when Arrow cannot represent them.
+
+Besides running a query in full, a job can fetch one page of its result,
+count its rows or explain its plan, so the result viewer does not run
+student SQL on the script thread either.
+
+The pool is enabled with SQL_TRAINER_QUERY_WORKERS; ``execute``,
+``fetch_page``, ``count_rows`` and ``explain_plan`` fall back to running
+inline on the session's connection when it is 0.
+"""
+import atexit
+import functools
+import logging
+import multiprocessing
+import pickle
+import queue
+import threading
+from concurrent.futures import Future
+
+import pandas as pd
+
+from core import config, execution
+from core.datasets import DATASETS
+from core.execution import DEFAULT_BUDGET, QueryBudgetExceeded, QueryStats
+from core.resultcache import get_result_cache
+
+logger = logging.getLogger(__name__)
+
+# Seconds a worker gets on top of the query's own time limit before it is killed
+KILL_GRACE = 1.0
+
+# What a job does with its query: (conn, sql, budget, stats, *args) -> result
+OPERATIONS = {
+    "query": lambda conn, sql, budget, stats: execution.run_query(conn, sql, budget, stats),
+    "page": lambda conn, sql, budget, stats, page: execution.fetch_page(conn, sql, page, budget=budget),
+    "count": lambda conn, sql, budget, stats: execution.count_rows(conn, sql, budget),
+    "plan": lambda conn, sql, budget, stats: execution.explain_plan(conn, sql),
+}
+
+
+# --- Result serialization ---
+def _encode(frame):
+    if not isinstance(frame, pd.DataFrame):
+        # A page with its has_more flag, a row count or a plan
+        return "pickle", pickle.dumps(frame, protocol=pickle.HIGHEST_PROTOCOL)
+    try:
+        import pyarrow as pa
+    except ImportError:
+        return "pickle", pickle.dumps(frame, protocol=pickle.HIGHEST_PROTOCOL)
+    try:
+        table = pa.Table.from_pandas(frame, preserve_index=False)
+    except (pa.ArrowException, ValueError, TypeError):
+        # Duplicate column names or mixed-type SQLite columns
+        return "pickle", pickle.dumps(frame, protocol=pickle.HIGHEST_PROTOCOL)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return "arrow", sink.getvalue().to_pybytes()
+
+
+def _decode(kind, payload):
+    if kind == "arrow":
+        import pyarrow as pa
+        return pa.ipc.open_stream(payload).read_all().to_pandas()
+    return pickle.loads(payload)
+
+
+# --- Worker process ---
+def _worker_main(conn, dataset_names):
+    from core.sandbox import open_read_only
+
+    sandboxes = {}
+
+    def sandbox(name):
+        if name not in sandboxes:
+            sandboxes[name] = open_read_only(name)
+        return sandboxes[name]
+
+    for name in dataset_names:
+        sandbox(name)
+    conn.send("ready")
+
+    while True:
+        try:
+            job = conn.recv()
+        except EOFError:
+            return
+        if job is None:
+            return
+        operation, dataset_name, sql, budget, args = job
+        stats = QueryStats()
+        try:
+            result = OPERATIONS[operation](sandbox(dataset_name), sql, budget, stats, *args)
+            conn.send(("ok", *_encode(result), stats))
+        except Exception as e:
+            try:
+                conn.send(("error", e, stats))
+            except Exception:
+                conn.send(("error", RuntimeError(str(e)), stats))
+        finally:
+            # The next student must find the dataset as it was built
+            used = sandboxes.get(dataset_name)
+            if used is not None and (used.in_transaction or used.total_changes):
+                used.close()
+                del sandboxes[dataset_name]
+
+
+class _Worker:
+    def __init__(self, context, dataset_names):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=_worker_main, args=(child_conn, dataset_names), daemon=True)
+        self.process.start()
+        child_conn.close()
+        try:
+            self.conn.recv()  # wait until the sandboxes are warm
+        except EOFError:
+            self.kill()
+            raise RuntimeError("A query worker failed to start.") from None
+
+    def stop(self):
+        try:
+            self.conn.send(None)
+        except OSError:
+            pass
+        self.process.join(timeout=5)
+        self.kill()
+
+    def kill(self):
+        if self.process.is_alive():
+            self.process.kill()
+        self.process.join()
+        self.conn.close()
+
+
+class QueryPool:
+    def __init__(self, size, dataset_names=()):
+        # Never fork the multi-threaded server process
+        self._context = multiprocessing.get_context("spawn")
+        self._dataset_names = tuple(dataset_names)
+        self._jobs = queue.Queue()
+        self._lock = threading.Lock()
+        self.size = size
+        self.busy = 0
+        self.completed = 0
+        self.killed = 0
+        self._dispatchers = [
+            threading.Thread(target=self._dispatch, name=f"query-pool-{number}", daemon=True)
+            for number in range(size)
+        ]
+        for dispatcher in self._dispatchers:
+            dispatcher.start()
+        atexit.register(self.shutdown)
+
+    def submit(self, dataset_name, sql, budget=DEFAULT_BUDGET, operation="query", args=()):
+        """Queue a job; the future resolves to ``(result, QueryStats)``, where the result of a
+        "query" is its DataFrame (see ``OPERATIONS`` for the others)."""
+        future = Future()
+        self._jobs.put((future, operation, dataset_name, sql, budget, args))
+        return future
+
+    def run(self, dataset_name, sql, budget=DEFAULT_BUDGET, stats=None, operation="query", args=()):
+        result, job_stats = self.submit(dataset_name, sql, budget, operation, args).result()
+        if stats is not None:
+            vars(stats).update(vars(job_stats))
+        return result
+
+    def metrics(self):
+        with self._lock:
+            return {
+                "workers": self.size,
+                "busy": self.busy,
+                "queue_depth": self._jobs.qsize(),
+                "completed": self.completed,
+                "killed": self.killed,
+            }
+
+    def shutdown(self):
+        for _ in self._dispatchers:
+            self._jobs.put(None)
+        for dispatcher in self._dispatchers:
+            dispatcher.join(timeout=10)
+
+    def _start_worker(self):
+        try:
+            return _Worker(self._context, self._dataset_names)
+        except RuntimeError:
+            logger.exception("Could not start a query worker")
+            return None
+
+    def _dispatch(self):
+        worker = self._start_worker()
+        while True:
+            job = self._jobs.get()
+            if job is None:
+                if worker is not None:
+                    worker.stop()
+                return
+            future, operation, dataset_name, sql, budget, args = job
+            if not future.set_running_or_notify_cancel():
+                continue
+            if worker is None:
+                worker = self._start_worker()
+                if worker is None:
+                    future.set_exception(RuntimeError("No query worker is available."))
+                    continue
+
+            with self._lock:
+                self.busy += 1
+            restart = False
+            try:
+                worker.conn.send((operation, dataset_name, sql, budget, args))
+                if worker.conn.poll(budget.time_limit + KILL_GRACE):
+                    reply = worker.conn.recv()
+                else:
+                    reply = ("error", QueryBudgetExceeded(
+                        f"Query exceeded budget: more than {budget.time_limit:g} seconds."), None)
+                    restart = True
+            except (EOFError, OSError):
+                reply = ("error", RuntimeError("The query worker stopped unexpectedly."), None)
+                restart = True
+            finally:
+                with self._lock:
+                    self.busy -= 1
+                    self.completed += 1
+
+            if reply[0] == "ok":
+                _, kind, payload, stats = reply
+                future.set_result((_decode(kind, payload), stats))
+            else:
+                future.set_exception(reply[1])
+            if restart:
+                worker = self._replace(worker)
+
+    def _replace(self, worker):
+        worker.kill()
+        with self._lock:
+            self.killed += 1
+        return self._start_worker()
+
+
+@functools.lru_cache(maxsize=None)
+def get_pool():
+    # Grading variants are opened by a worker the first time a job needs them
+    return QueryPool(config.QUERY_WORKERS, list(DATASETS))
+
+
+def execute(dataset_name, sql, conn=None, budget=DEFAULT_BUDGET, stats=None, pristine=True):
+    """Run ``sql`` in the worker pool when enabled, otherwise inline.
+
+    Inline execution uses ``conn``, or a fresh sandbox when it is None. Pass
+    ``pristine=False`` when ``conn`` no longer matches the dataset (a session
+    sandbox the student has written to); the query then always runs on it.
+    Pristine results are shared between sessions through the result cache;
+    a shared frame is relabelled with the column names as ``sql`` spells them.
+    """
+    if not (pristine and config.RESULT_CACHE_MB):
+        return _execute(dataset_name, sql, conn, budget, stats, pristine)
+
+    cache = get_result_cache()
+    run_stats = QueryStats()
+    frame, cached_stats = cache.get_or_run(
+        cache.key(dataset_name, sql, budget),
+        lambda: (_execute(dataset_name, sql, conn, budget, run_stats, pristine), run_stats))
+    if stats is not None:
+        vars(stats).update(vars(cached_stats))
+        stats.cached = cached_stats is not run_stats
+    if cached_stats is not run_stats:
+        frame = _relabel(frame, dataset_name, sql)
+    return frame
+
+
+def _relabel(frame, dataset_name, sql):
+    """``frame`` under the column names of ``sql``, which may differ from the cached query's in case."""
+    from core.sandbox import result_columns
+    columns = result_columns(dataset_name, sql)
+    if columns is None or len(columns) != len(frame.columns) or columns == list(frame.columns):
+        return frame
+    return frame.set_axis(columns, axis="columns")
+
+
+def fetch_page(dataset_name, sql, page, conn=None, pristine=True, budget=DEFAULT_BUDGET):
+    """One page of the result as ``(DataFrame, has_more)``; runs where ``execute`` would."""
+    return _execute(dataset_name, sql, conn, budget, None, pristine, "page", (page,))
+
+
+def count_rows(dataset_name, sql, conn=None, pristine=True, budget=DEFAULT_BUDGET):
+    return _execute(dataset_name, sql, conn, budget, None, pristine, "count")
+
+
+def explain_plan(dataset_name, sql, conn=None, pristine=True):
+    return _execute(dataset_name, sql, conn, DEFAULT_BUDGET, None, pristine, "plan")
+
+
+def _execute(dataset_name, sql, conn, budget, stats, pristine, operation="query", args=()):
+    if config.QUERY_WORKERS and pristine:
+        return get_pool().run(dataset_name, sql, budget, stats, operation, args)
+    run = OPERATIONS[operation]
+    if conn is not None:
+        return run(conn, sql, budget, stats, *args)
+
+    from core.sandbox import open_read_only
+    conn = open_read_only(dataset_name)
+    try:
+        return run(conn, sql, budget, stats, *args)
+    finally:
+        conn.close()
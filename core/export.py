@@ -0,0 +1,124 @@
+"""Streaming export of the submission log as CSV, Parquet or Arrow IPC.
+
+Only the partitions in the date range are opened, and rows are read and
+written one chunk at a time, so memory use stays flat however long the log
+is. The teacher's download is generated only when the button is clicked,
+but Streamlit then holds the finished file in memory until it is served,
+so it is capped at SQL_TRAINER_EXPORT_MAX_MB; larger exports go through
+the command line:
+
+    python -m core.export submissions.parquet [--since 2025-09-01] [--until 2025-12-31]
+                          [--student NAME ...] [--category CATEGORY ...]
+"""
+import argparse
+import codecs
+import csv
+import io
+import os
+from dataclasses import dataclass
+
+from core.segments import arrow_schema, record_batch
+from core.submissions import COLUMNS, get_store
+
+# File extension and MIME type per format
+FORMATS = {
+    "csv": ("csv", "text/csv"),
+    "parquet": ("parquet", "application/vnd.apache.parquet"),
+    "arrow": ("arrow", "application/vnd.apache.arrow.stream"),
+}
+# Rows read from the database and written out at a time
+CHUNK_ROWS = 10_000
+
+
+class ExportTooLarge(Exception):
+    pass
+
+
+@dataclass
+class ExportFilter:
+    """Which submissions to export; dates are ISO strings, both ends inclusive."""
+    since: str = None
+    until: str = None
+    names: tuple = ()
+    categories: tuple = ()
+
+
+def export(out, fmt="csv", filters=None, store=None, chunk_rows=CHUNK_ROWS, max_bytes=None):
+    """Write the matching submissions to the binary file ``out``; returns the row count.
+
+    With ``max_bytes``, stops with ``ExportTooLarge`` within a chunk of
+    passing that size.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown export format: {fmt}")
+    store = store or get_store()
+    filters = filters or ExportFilter()
+    chunks = ([row[1:] for row in rows]
+              for rows in store.iter_rows(filters.since, filters.until, filters.names, filters.categories,
+                                          chunk_rows=chunk_rows))
+    count = 0
+
+    def check_size():
+        if max_bytes and out.tell() > max_bytes:
+            raise ExportTooLarge(f"Export is larger than {max_bytes // (1024 * 1024)} MB; "
+                                 f"narrow the filters or use python -m core.export.")
+
+    if fmt == "csv":
+        text = codecs.getwriter("utf-8")(out)
+        writer = csv.writer(text, lineterminator="\n")
+        writer.writerow(COLUMNS)
+        correct = COLUMNS.index("correct")
+        for rows in chunks:
+            writer.writerows(row[:correct] + (bool(row[correct]),) + row[correct + 1:] for row in rows)
+            count += len(rows)
+            check_size()
+        return count
+
+    import pyarrow.ipc
+    import pyarrow.parquet
+
+    schema = arrow_schema(COLUMNS)
+    if fmt == "parquet":
+        writer = pyarrow.parquet.ParquetWriter(out, schema)
+    else:
+        writer = pyarrow.ipc.new_stream(out, schema)
+    with writer:
+        for rows in chunks:
+            writer.write_batch(record_batch(schema, rows))
+            count += len(rows)
+            check_size()
+    return count
+
+
+def export_file(fmt="csv", filters=None, store=None, max_bytes=None):
+    """The export in memory as a ``BytesIO`` at its start, e.g. for a download button.
+
+    Streamlit copies the file into memory anyway, so pass ``max_bytes``.
+    """
+    out = io.BytesIO()
+    export(out, fmt, filters, store, max_bytes=max_bytes)
+    out.seek(0)
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export stored submissions.")
+    parser.add_argument("output", help="file to write; the format follows its extension unless --format is given")
+    parser.add_argument("--format", choices=sorted(FORMATS), help="csv, parquet or arrow")
+    parser.add_argument("--since", help="first day to include (YYYY-MM-DD)")
+    parser.add_argument("--until", help="last day to include (YYYY-MM-DD)")
+    parser.add_argument("--student", action="append", default=[], help="only this student (repeatable)")
+    parser.add_argument("--category", action="append", default=[], help="only this task category (repeatable)")
+    args = parser.parse_args()
+
+    fmt = args.format or os.path.splitext(args.output)[1].lstrip(".").lower()
+    if fmt not in FORMATS:
+        parser.error("cannot tell the format from the file name; pass --format")
+    filters = ExportFilter(args.since, args.until, tuple(args.student), tuple(args.category))
+    with open(args.output, "wb") as out:
+        count = export(out, fmt, filters)
+    print(f"Exported {count:,} submissions to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
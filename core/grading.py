@@ -0,0 +1,218 @@
+"""Expected results for tasks, computed once per dataset version.
+
+Entries are keyed by the dataset version and a hash of the task's expected
+SQL, so fixing a task's answer or changing the fixture data both produce a
+fresh entry. With ``CACHE_DIR`` set, results are also pickled to disk and
+reused across restarts.
+
+``grade`` also remembers verdicts by query fingerprint, so a submission
+that was graded before for the same task is not run and compared again.
+An answer that matches on the dataset must match on each hidden variant
+too (see ``core.variants``). The variants only run for answers that would
+otherwise count as correct: side by side in the worker pool when it is
+enabled, else one after another until the first mismatch.
+"""
+import collections
+import hashlib
+import os
+import pickle
+import sqlite3
+import threading
+
+from core.compare import results_match, rules_for
+from core import config
+from core.config import CACHE_DIR
+from core.datasets import get_dataset
+from core.execution import DEFAULT_BUDGET, EXPECTED_BUDGET, QueryBudgetExceeded
+from core.executor import execute, get_pool
+from core.sqltext import fingerprint
+from core.variants import variant_names
+
+# Verdicts remembered; the least recently used are forgotten beyond this
+MAX_VERDICTS = 100_000
+
+
+class ExpectedResultCache:
+    def __init__(self, cache_dir=None):
+        self.cache_dir = cache_dir
+        self._frames = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(dataset_name, expected_sql):
+        sql_hash = hashlib.sha256(expected_sql.strip().encode("utf-8")).hexdigest()[:16]
+        return get_dataset(dataset_name).version, sql_hash
+
+    def get(self, dataset_name, expected_sql):
+        """Return the expected DataFrame; callers must not modify it."""
+        frame = self.cached(dataset_name, expected_sql)
+        if frame is not None:
+            return frame
+
+        key = self.key(dataset_name, expected_sql)
+        frame = execute(dataset_name, expected_sql, budget=EXPECTED_BUDGET)
+        self._store(key, frame)
+        with self._lock:
+            return self._frames.setdefault(key, frame)
+
+    def cached(self, dataset_name, expected_sql):
+        """The expected DataFrame if it is in memory or on disk, else None; never runs the query."""
+        key = self.key(dataset_name, expected_sql)
+        with self._lock:
+            frame = self._frames.get(key)
+        if frame is not None:
+            return frame
+        frame = self._load(key)
+        if frame is None:
+            return None
+        with self._lock:
+            return self._frames.setdefault(key, frame)
+
+    def put(self, dataset_name, expected_sql, frame):
+        key = self.key(dataset_name, expected_sql)
+        with self._lock:
+            if key in self._frames:
+                return
+            self._frames[key] = frame
+        self._store(key, frame)
+
+    def warm(self, dataset_name, expected_queries):
+        for expected_sql in expected_queries:
+            self.get(dataset_name, expected_sql)
+
+    # --- Disk persistence ---
+    def _path(self, key):
+        version, sql_hash = key
+        return os.path.join(self.cache_dir, "expected", version, f"{sql_hash}.pkl")
+
+    def _load(self, key):
+        if not self.cache_dir:
+            return None
+        try:
+            with open(self._path(key), "rb") as f:
+                return pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError,
+                AttributeError, ImportError, TypeError, ValueError):
+            # Unreadable, or pickled by another pandas version: run the query again
+            return None
+
+    def _store(self, key, frame):
+        if not self.cache_dir:
+            return
+        path = self._path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as f:
+                pickle.dump(frame, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+        except OSError:
+            pass
+
+
+expected_results = ExpectedResultCache(CACHE_DIR)
+
+
+class VerdictIndex:
+    """Known verdicts by task and query fingerprint.
+
+    A query with the fingerprint of the task's own answer is correct; other
+    fingerprints are known once graded. Only verdicts on the pristine
+    dataset belong here.
+    """
+
+    def __init__(self, max_entries=MAX_VERDICTS):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._verdicts = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(dataset_name, expected_sql, sql):
+        return ExpectedResultCache.key(dataset_name, expected_sql), fingerprint(sql)
+
+    def get(self, dataset_name, expected_sql, sql):
+        """True or False if the verdict is known, else None."""
+        key = self.key(dataset_name, expected_sql, sql)
+        answer = fingerprint(expected_sql)
+        with self._lock:
+            verdict = self._verdicts.get(key)
+            if verdict is not None:
+                self._verdicts.move_to_end(key)
+            elif key[1] == answer:
+                verdict = True
+            if verdict is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return verdict
+
+    def put(self, dataset_name, expected_sql, sql, correct):
+        key = self.key(dataset_name, expected_sql, sql)
+        with self._lock:
+            self._verdicts[key] = bool(correct)
+            self._verdicts.move_to_end(key)
+            if len(self._verdicts) > self.max_entries:
+                self._verdicts.popitem(last=False)
+
+    def metrics(self):
+        with self._lock:
+            return {"entries": len(self._verdicts), "hits": self.hits, "misses": self.misses}
+
+
+verdicts = VerdictIndex()
+
+
+def grading_budget(dataset_name, expected_sql):
+    """The query budget with room for the task's own answer on ``dataset_name``.
+
+    A correct answer returns exactly as many rows as the expected query, so
+    whole-table tasks stay gradeable at any dataset scale.
+    """
+    return DEFAULT_BUDGET.for_rows(len(expected_results.get(dataset_name, expected_sql)))
+
+
+def passes_variants(dataset_name, expected_sql, sql):
+    """Whether ``sql`` also returns the expected result on every hidden variant of the dataset."""
+    rules = rules_for(expected_sql)
+    variants = variant_names(dataset_name)
+    expected = [expected_results.get(variant, expected_sql) for variant in variants]
+    budgets = [DEFAULT_BUDGET.for_rows(len(frame)) for frame in expected]
+    # No threads inline: the budget's progress handler needs the GIL every few thousand steps
+    futures = ([get_pool().submit(variant, sql, budget) for variant, budget in zip(variants, budgets)]
+               if config.QUERY_WORKERS else [])
+    try:
+        for i, variant in enumerate(variants):
+            try:
+                frame = futures[i].result()[0] if futures else execute(variant, sql, budget=budgets[i])
+            except (sqlite3.Error, QueryBudgetExceeded):
+                return False
+            if not results_match(frame, expected[i], rules):
+                return False
+        return True
+    finally:
+        for future in futures:
+            future.cancel()
+
+
+def grade(dataset_name, expected_sql, sql, run, pristine=True):
+    """Grade ``sql`` against the task answered by ``expected_sql``.
+
+    ``run(budget)`` returns the submission's result under ``budget`` and is
+    only called when the verdict is not known yet. Pass ``pristine=False``
+    when it runs on a sandbox with student writes; such verdicts are neither
+    read nor kept.
+    Returns ``(correct, frame)``, where frame is None if ``run`` was skipped.
+    """
+    if pristine:
+        correct = verdicts.get(dataset_name, expected_sql, sql)
+        if correct is not None:
+            return correct, None
+    frame = run(grading_budget(dataset_name, expected_sql))
+    correct = results_match(frame, expected_results.get(dataset_name, expected_sql), rules_for(expected_sql))
+    if correct:
+        correct = passes_variants(dataset_name, expected_sql, sql)
+    if pristine:
+        verdicts.put(dataset_name, expected_sql, sql, correct)
+    return correct, frame
@@ -0,0 +1,121 @@
+"""Live class leaderboard, maintained incrementally from solved tasks.
+
+Each process follows the progress store's score events by rowid, so a
+refresh applies only the points earned since the last one, on whichever
+replica they were recorded. Crediting a student costs O(log n): a Fenwick
+tree counts students per score for ranks, and a sorted top-K list is
+updated in place. Scores only go down when a re-grade takes a solved task
+back; if that moves a student down from the list, it is rebuilt from all
+scores.
+"""
+import bisect
+import functools
+import heapq
+import threading
+from dataclasses import dataclass
+
+from core import config
+from core.progress import get_progress_store
+
+
+class FenwickTree:
+    """Counts per non-negative integer key, with O(log n) updates and prefix sums."""
+
+    def __init__(self, size=64):
+        self._tree = [0] * (size + 1)
+
+    def add(self, key, delta):
+        if key + 1 >= len(self._tree):
+            self._grow(key + 1)
+        i = key + 1
+        while i < len(self._tree):
+            self._tree[i] += delta
+            i += i & -i
+
+    def prefix(self, key):
+        """Total count of the keys up to and including ``key``."""
+        i = min(key + 1, len(self._tree) - 1)
+        total = 0
+        while i > 0:
+            total += self._tree[i]
+            i -= i & -i
+        return total
+
+    def _grow(self, size):
+        counts = [self.prefix(key) - self.prefix(key - 1) for key in range(len(self._tree) - 1)]
+        self._tree = [0] * (max(size, 2 * len(counts)) + 1)
+        for key, count in enumerate(counts):
+            if count:
+                self.add(key, count)
+
+
+@dataclass
+class Standing:
+    rank: int
+    name: str
+    score: int
+
+
+class Leaderboard:
+    def __init__(self, size):
+        self.size = size
+        self._scores = {}
+        self._counts = FenwickTree()
+        self._top = []  # (-score, name), best first, at most ``size`` entries
+        self._last_rowid = 0
+        self._lock = threading.Lock()
+
+    @property
+    def students(self):
+        return len(self._scores)
+
+    def refresh(self, store=None):
+        """Apply the score events recorded since the last refresh."""
+        store = store or get_progress_store()
+        with self._lock:
+            conn = store.connect()
+            try:
+                rows = conn.execute("SELECT rowid, name, points FROM score_events WHERE rowid > ? "
+                                    "ORDER BY rowid", (self._last_rowid,)).fetchall()
+            finally:
+                conn.close()
+            for rowid, name, points in rows:
+                self._credit(name, points)
+                self._last_rowid = rowid
+
+    def _credit(self, name, points):
+        old = self._scores.get(name)
+        new = self._scores[name] = (old or 0) + points
+        listed = False
+        if old is not None:
+            self._counts.add(old, -1)
+            i = bisect.bisect_left(self._top, (-old, name))
+            listed = i < len(self._top) and self._top[i] == (-old, name)
+            if listed:
+                del self._top[i]
+        self._counts.add(new, 1)
+        if listed and points < 0:
+            # Someone below the list may now belong on it
+            self._top = heapq.nsmallest(self.size, ((-score, student)
+                                                    for student, score in self._scores.items()))
+        elif len(self._top) < self.size or (-new, name) < self._top[-1]:
+            bisect.insort(self._top, (-new, name))
+            del self._top[self.size:]
+
+    def _rank(self, score):
+        # Students with the same score share a rank
+        return len(self._scores) - self._counts.prefix(score) + 1
+
+    def top(self):
+        with self._lock:
+            return [Standing(self._rank(-negated), name, -negated) for negated, name in self._top]
+
+    def standing(self, name):
+        with self._lock:
+            score = self._scores.get(name)
+            return None if score is None else Standing(self._rank(score), name, score)
+
+
+@functools.lru_cache(maxsize=None)
+def get_leaderboard():
+    return Leaderboard(config.LEADERBOARD_SIZE)
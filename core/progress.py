@@ -0,0 +1,127 @@
+"""Scores and task completions per student, shared by every session.
+
+The reference backend is a WAL-mode SQLite file that all server replicas
+open. A completion is keyed by student and task and inserted with
+``INSERT OR IGNORE``, so answering a solved task again adds nothing; the
+student's score only grows in the same transaction when a completion is
+new. Re-grading can take a completion back with ``revoke``.
+
+Every change to a score is also appended to ``score_events``, which the
+leaderboard follows by rowid.
+"""
+import functools
+import sqlite3
+from dataclasses import dataclass, field
+from datetime import datetime
+
+from core import config
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS completions (
+    name TEXT,
+    category TEXT,
+    task_index INTEGER,
+    points INTEGER NOT NULL,
+    completed_at TEXT NOT NULL,
+    PRIMARY KEY (name, category, task_index)
+);
+CREATE TABLE IF NOT EXISTS scores (
+    name TEXT PRIMARY KEY,
+    score INTEGER NOT NULL,
+    updated_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS score_events (
+    name TEXT NOT NULL,
+    points INTEGER NOT NULL,
+    created_at TEXT NOT NULL
+);
+"""
+# Stores created before score_events existed start its log from their completions
+BACKFILL_EVENTS = """
+INSERT INTO score_events (name, points, created_at)
+SELECT name, points, completed_at FROM completions
+WHERE NOT EXISTS (SELECT 1 FROM score_events)
+ORDER BY rowid
+"""
+ADD_POINTS = """
+INSERT INTO scores (name, score, updated_at) VALUES (:name, :points, :now)
+ON CONFLICT (name) DO UPDATE SET score = score + excluded.score, updated_at = excluded.updated_at
+"""
+LOG_POINTS = "INSERT INTO score_events (name, points, created_at) VALUES (:name, :points, :now)"
+
+
+@dataclass
+class Progress:
+    score: int = 0
+    completed: set = field(default_factory=set)  # (category, task_index)
+
+
+class ProgressStore:
+    def __init__(self, path):
+        self.path = path
+        conn = self.connect()
+        try:
+            conn.executescript(SCHEMA)
+            with conn:
+                conn.execute("BEGIN IMMEDIATE")
+                conn.execute(BACKFILL_EVENTS)
+        finally:
+            conn.close()
+
+    def connect(self):
+        conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def complete(self, name, category, task_index, points=1):
+        """Record a solved task; returns ``(new, score)``, where ``new`` is False if it was solved before."""
+        now = datetime.now().isoformat()
+        conn = self.connect()
+        try:
+            with conn:
+                new = conn.execute(
+                    "INSERT OR IGNORE INTO completions (name, category, task_index, points, completed_at) "
+                    "VALUES (?, ?, ?, ?, ?)", (name, category, task_index, points, now)).rowcount == 1
+                if new:
+                    self._add_points(conn, name, points, now)
+                score = conn.execute("SELECT score FROM scores WHERE name = ?", (name,)).fetchone()
+        finally:
+            conn.close()
+        return new, score[0] if score else 0
+
+    def revoke(self, name, category, task_index):
+        """Take back a completion, e.g. after re-grading; returns ``(revoked, score)``."""
+        now = datetime.now().isoformat()
+        conn = self.connect()
+        try:
+            with conn:
+                removed = conn.execute("DELETE FROM completions WHERE name = ? AND category = ? "
+                                       "AND task_index = ? RETURNING points",
+                                       (name, category, task_index)).fetchone()
+                if removed:
+                    self._add_points(conn, name, -removed[0], now)
+                score = conn.execute("SELECT score FROM scores WHERE name = ?", (name,)).fetchone()
+        finally:
+            conn.close()
+        return removed is not None, score[0] if score else 0
+
+    @staticmethod
+    def _add_points(conn, name, points, now):
+        params = {"name": name, "points": points, "now": now}
+        conn.execute(ADD_POINTS, params)
+        conn.execute(LOG_POINTS, params)
+
+    def progress(self, name):
+        conn = self.connect()
+        try:
+            score = conn.execute("SELECT score FROM scores WHERE name = ?", (name,)).fetchone()
+            completed = conn.execute("SELECT category, task_index FROM completions WHERE name = ?", (name,))
+            return Progress(score[0] if score else 0, set(completed.fetchall()))
+        finally:
+            conn.close()
+
+
+@functools.lru_cache(maxsize=None)
+def get_progress_store():
+    return ProgressStore(config.PROGRESS_DB)
@@ -0,0 +1,226 @@
+"""Re-grade the whole submission history against the current task catalog.
+
+Submissions are grouped by dataset and query fingerprint, so each distinct
+answer is executed once however many students sent it, in whatever
+spelling, and then compared with every task it was submitted for. Answers
+whose verdict is already known are not run at all; the rest are graded in
+batches across worker processes, against expected results computed once in
+the parent. Changed verdicts are written back to the submission store and
+returned as a diff, and the progress store gains or loses the completions
+they decide.
+
+    python -m core.regrade [--workers N] [--dry-run]
+"""
+import argparse
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+
+from core import config
+from core.catalog import LESSONS, get_catalog
+from core.compare import results_match, rules_for
+from core.execution import DEFAULT_BUDGET, run_query
+from core.grading import expected_results, verdicts
+from core.progress import get_progress_store
+from core.sandbox import open_read_only
+from core.sqltext import fingerprint
+from core.submissions import get_store, get_tail
+from core.variants import variant_names
+
+# Distinct queries handed to a worker at a time
+BATCH_SIZE = 50
+
+# Expected results, handed to each worker process once by _init_worker
+_expected = {}
+
+
+@dataclass
+class RegradeReport:
+    submissions: int = 0
+    unique_queries: int = 0
+    skipped: int = 0
+    elapsed: float = 0.0
+    # (id, name, category, task_index, old verdict, new verdict)
+    changes: list = field(default_factory=list)
+    # Completions added to and taken back from the progress store
+    credited: int = 0
+    revoked: int = 0
+
+
+def grade_batch(dataset_name, batch, expected=None):
+    """Grade ``[(key, sql, [(category, index, expected_sql), ...]), ...]``.
+
+    Like ``grade``, an answer must match on the dataset and on each hidden
+    variant; ``expected`` maps ``(dataset or variant, expected_sql)`` to the
+    expected result. Returns ``(key, category, index, correct)`` for every pair.
+    """
+    expected = _expected if expected is None else expected
+    conns = {name: open_read_only(name) for name in (dataset_name, *variant_names(dataset_name))}
+    results = []
+    try:
+        for key, sql, tasks in batch:
+            frames = {}
+            # Room for the largest answer among the tasks, as ``grade`` gives one task's answer
+            budgets = {name: DEFAULT_BUDGET.for_rows(max(len(expected[name, expected_sql])
+                                                         for _, _, expected_sql in tasks))
+                       for name in conns}
+            for category, index, expected_sql in tasks:
+                rules = rules_for(expected_sql)
+                correct = all(_matches(conns, frames, name, sql, expected[name, expected_sql], rules,
+                                       budgets[name])
+                              for name in conns)
+                results.append((key, category, index, correct))
+    finally:
+        for conn in conns.values():
+            conn.close()
+    return results
+
+
+def _matches(conns, frames, dataset_name, sql, expected, rules, budget):
+    # Each dataset runs the query at most once per batch item, and only once it is needed
+    if dataset_name not in frames:
+        try:
+            frames[dataset_name] = run_query(conns[dataset_name], sql, budget)
+        except Exception:
+            frames[dataset_name] = None
+    frame = frames[dataset_name]
+    return frame is not None and results_match(frame, expected, rules)
+
+
+def _expected_frames(batches):
+    """Expected results of every task in ``batches``, from this process's cache."""
+    queries = {(dataset_name, expected_sql) for dataset_name, items in batches
+               for _, _, tasks in items for _, _, expected_sql in tasks}
+    return {(name, expected_sql): expected_results.get(name, expected_sql)
+            for dataset_name, expected_sql in queries for name in (dataset_name, *variant_names(dataset_name))}
+
+
+def _init_worker(expected):
+    # Batches run their queries inline; a worker must not start a query pool of its own
+    config.QUERY_WORKERS = 0
+    _expected.update(expected)
+
+
+def _batches(jobs):
+    by_dataset = {}
+    for (dataset_name, key), (sql, tasks) in jobs.items():
+        if tasks:
+            by_dataset.setdefault(dataset_name, []).append((key, sql, sorted(tasks)))
+    for dataset_name, items in by_dataset.items():
+        for start in range(0, len(items), BATCH_SIZE):
+            yield dataset_name, items[start:start + BATCH_SIZE]
+
+
+def regrade(store=None, workers=None, progress=None, apply=True, progress_store=None):
+    """Re-grade every stored submission; ``progress(done, total)`` is called per batch."""
+    started = time.perf_counter()
+    store = store or get_store()
+    store.flush()
+
+    tasks = {}
+    for lesson in LESSONS:
+        catalog = get_catalog(lesson)
+        for task in catalog:
+            tasks[task.category, task.index] = (catalog.dataset, task.expected)
+
+    rows = [row for chunk in store.iter_rows() for row in chunk]
+
+    report = RegradeReport(submissions=len(rows))
+    jobs = {}
+    graded = []
+    results = {}
+    for submission_id, _, name, category, task_index, query, correct, *_ in rows:
+        task = tasks.get((category, task_index))
+        if task is None or not query:
+            report.skipped += 1
+            continue
+        dataset_name, expected_sql = task
+        key = fingerprint(query)
+        _, pending = jobs.setdefault((dataset_name, key), (query, set()))
+        if (key, category, task_index) not in results:
+            known = verdicts.get(dataset_name, expected_sql, query)
+            if known is None:
+                pending.add((category, task_index, expected_sql))
+            else:
+                results[key, category, task_index] = known
+        graded.append((submission_id, name, category, task_index, bool(correct), key))
+    report.unique_queries = len(jobs)
+
+    batches = list(_batches(jobs))
+    expected = _expected_frames(batches)
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(batches) <= 1:
+        for done, batch in enumerate(batches, start=1):
+            results.update(_verdict_map(grade_batch(*batch, expected)))
+            if progress:
+                progress(done, len(batches))
+    else:
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=min(workers, len(batches)), mp_context=context,
+                                 initializer=_init_worker, initargs=(expected,)) as pool:
+            futures = [pool.submit(grade_batch, *batch) for batch in batches]
+            for done, future in enumerate(as_completed(futures), start=1):
+                results.update(_verdict_map(future.result()))
+                if progress:
+                    progress(done, len(batches))
+
+    for (dataset_name, key), (sql, pending) in jobs.items():
+        for category, task_index, expected_sql in pending:
+            verdicts.put(dataset_name, expected_sql, sql, results[key, category, task_index])
+
+    for submission_id, name, category, task_index, old, key in graded:
+        new = results[key, category, task_index]
+        if new != old:
+            report.changes.append((submission_id, name, category, task_index, old, new))
+
+    if apply and report.changes:
+        store.update_verdicts((submission_id, new) for submission_id, *_, new in report.changes)
+        get_tail().reset()
+        report.credited, report.revoked = _reconcile_progress(graded, results, report.changes, progress_store)
+
+    report.elapsed = time.perf_counter() - started
+    return report
+
+
+def _reconcile_progress(graded, results, changes, progress_store=None):
+    """Credit or take back the tasks whose solved state the changed verdicts decide."""
+    progress_store = progress_store or get_progress_store()
+    affected = {(name, category, task_index) for _, name, category, task_index, _, _ in changes if name}
+    solved = {(name, category, task_index) for _, name, category, task_index, _, key in graded
+              if (name, category, task_index) in affected and results[key, category, task_index]}
+    credited = revoked = 0
+    for name, category, task_index in sorted(affected):
+        if (name, category, task_index) in solved:
+            credited += progress_store.complete(name, category, task_index)[0]
+        else:
+            revoked += progress_store.revoke(name, category, task_index)[0]
+    return credited, revoked
+
+
+def _verdict_map(results):
+    return {(key, category, index): correct for key, category, index, correct in results}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-grade all stored submissions.")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--dry-run", action="store_true", help="report changes without saving them")
+    args = parser.parse_args()
+
+    def show_progress(done, total):
+        print(f"\rGraded batch {done}/{total}", end="", flush=True)
+
+    report = regrade(workers=args.workers, progress=show_progress, apply=not args.dry_run)
+    print()
+    print(f"{report.submissions:,} submissions, {report.unique_queries:,} distinct queries, "
+          f"{report.skipped:,} skipped, {len(report.changes):,} verdicts changed in {report.elapsed:.1f}s")
+    if report.credited or report.revoked:
+        print(f"Progress: {report.credited:,} tasks credited, {report.revoked:,} taken back")
+    for submission_id, name, category, task_index, old, new in report.changes:
+        print(f"  #{submission_id} {name} – {category} #{task_index + 1}: {old} -> {new}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""Process-wide cache of query results shared by all sessions.
+
+Keys are the dataset version, the normalized query text (case, whitespace,
+comments and trailing semicolons ignored) and the budget, so the many
+near-identical queries of a class land on one entry (``executor.execute``
+gives a hit back under the caller's own column names). Only queries against
+the pristine dataset are cached; session sandboxes with student writes
+bypass the cache. Entries are evicted least recently used first once the
+cached frames exceed the memory limit, and concurrent misses for the same
+key wait for a single execution instead of all running the query.
+"""
+import collections
+import functools
+import threading
+from concurrent.futures import Future
+
+from core import config
+from core.datasets import get_dataset
+from core.sqltext import normalize_sql
+
+
+class ResultCache:
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.bytes = 0
+        self._entries = collections.OrderedDict()
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(dataset_name, sql, budget):
+        return get_dataset(dataset_name).version, normalize_sql(sql), budget
+
+    def get_or_run(self, key, run):
+        """Cached ``(frame, stats)`` for ``key``, calling ``run()`` on a miss."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[:2]
+            pending = self._pending.get(key)
+            owner = pending is None
+            if owner:
+                self.misses += 1
+                pending = self._pending[key] = Future()
+            else:
+                self.hits += 1
+        if not owner:
+            return pending.result()
+
+        try:
+            frame, stats = run()
+        except BaseException as e:
+            pending.set_exception(e)
+            raise
+        else:
+            self._store(key, frame, stats)
+            pending.set_result((frame, stats))
+            return frame, stats
+        finally:
+            with self._lock:
+                self._pending.pop(key, None)
+
+    def _store(self, key, frame, stats):
+        size = int(frame.memory_usage(index=True, deep=True).sum())
+        # One huge result should not flush the whole cache
+        if size > self.max_bytes // 8:
+            return
+        with self._lock:
+            if key in self._entries:
+                return
+            self._entries[key] = (frame, stats, size)
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                _, (_, _, evicted) = self._entries.popitem(last=False)
+                self.bytes -= evicted
+
+    def metrics(self):
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self.bytes, "hits": self.hits, "misses": self.misses}
+
+
+@functools.lru_cache(maxsize=None)
+def get_result_cache():
+    return ResultCache(config.RESULT_CACHE_MB * 1024 * 1024)
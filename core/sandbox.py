@@ -0,0 +1,233 @@
+"""Sandbox databases for student queries.
+
+Each dataset is built once per process into a serialized template. Every
+script run gets its own private copy via ``deserialize``, which is a memory
+copy instead of replaying the schema and fixture inserts.
+
+Students additionally get one long-lived, writable ``Sandbox`` per session,
+so INSERT/UPDATE/DELETE and CREATE INDEX persist across reruns. Each one is
+capped with ``max_page_count``, can be reset to the pristine dataset with
+the backup API, and is dropped by the ``SandboxRegistry`` once it is the
+least recently used beyond the session limit or has been idle too long.
+"""
+import collections
+import functools
+import sqlite3
+import threading
+import time
+
+from core import config
+from core.datasets import get_dataset
+from core.execution import DEFAULT_BUDGET, QueryBudget, column_names, run_query
+from core.sqltext import normalize_sql
+
+# Authorizer actions of statements that only read
+READ_ACTIONS = {sqlite3.SQLITE_SELECT, sqlite3.SQLITE_READ, sqlite3.SQLITE_FUNCTION, sqlite3.SQLITE_RECURSIVE}
+# Informational pragmas students may run; all others are denied
+ALLOWED_PRAGMAS = {
+    "table_info", "table_xinfo", "table_list", "index_list", "index_info", "index_xinfo",
+    "foreign_key_list", "foreign_key_check", "database_list", "collation_list", "function_list",
+    "page_count", "page_size", "integrity_check", "quick_check",
+}
+# Work ``result_columns`` allows a query; over empty tables one needs a few hundred VM steps
+NAMING_BUDGET = QueryBudget(time_limit=0.5, max_vm_steps=100_000)
+# Longest string or blob a query may build while its columns are named
+NAMING_MAX_LENGTH = 1024 * 1024
+
+
+@functools.lru_cache(maxsize=None)
+def template_bytes(dataset_name):
+    conn = sqlite3.connect(":memory:")
+    try:
+        get_dataset(dataset_name).load(conn)
+        return conn.serialize()
+    finally:
+        conn.close()
+
+
+def open_sandbox(dataset_name, **connect_args):
+    conn = sqlite3.connect(":memory:", **connect_args)
+    conn.deserialize(template_bytes(dataset_name))
+    return conn
+
+
+def _pragma(conn, name):
+    return conn.execute(f"PRAGMA {name}").fetchone()[0]
+
+
+def _authorize_read(action, arg1, arg2, db_name, trigger):
+    if action == sqlite3.SQLITE_PRAGMA:
+        return sqlite3.SQLITE_OK if arg1.lower() in ALLOWED_PRAGMAS else sqlite3.SQLITE_DENY
+    return sqlite3.SQLITE_OK if action in READ_ACTIONS else sqlite3.SQLITE_DENY
+
+
+def open_read_only(dataset_name, **connect_args):
+    """A copy of the dataset for running student reads outside a session sandbox.
+
+    Anything but reading the dataset and informational pragmas is denied at
+    compile time, so no statement can change the connection for the next one
+    or reach another database file.
+    """
+    conn = open_sandbox(dataset_name, **connect_args)
+    conn.execute("PRAGMA query_only = ON")
+    conn.set_authorizer(_authorize_read)
+    return conn
+
+
+@functools.lru_cache(maxsize=None)
+def _snapshot(dataset_name):
+    """Pristine copy that session sandboxes are reset from."""
+    return open_sandbox(dataset_name, check_same_thread=False)
+
+
+def _schema_only(dataset_name):
+    """The dataset's tables without rows, for naming result columns cheaply."""
+    conn = sqlite3.connect(":memory:", check_same_thread=False)
+    conn.executescript(get_dataset(dataset_name).schema)
+    conn.execute("PRAGMA query_only = ON")
+    conn.set_authorizer(_authorize_read)
+    # Table-free queries still run in full; keep them from building large values
+    conn.setlimit(sqlite3.SQLITE_LIMIT_LENGTH, NAMING_MAX_LENGTH)
+    return conn
+
+
+# Idle schema-only connections per dataset; each call takes its own, so callers never wait on each other
+_schema_conns = collections.defaultdict(list)
+
+
+def result_columns(dataset_name, sql):
+    """Column names ``sql`` gives its result, as spelled in ``sql``.
+
+    The query runs against empty tables, so this costs about a compile.
+    Returns None when it cannot be run there or needs more than
+    ``NAMING_BUDGET``, e.g. a recursive CTE that reads no table.
+    """
+    idle = _schema_conns[dataset_name]
+    try:
+        conn = idle.pop()
+    except IndexError:
+        conn = _schema_only(dataset_name)
+    try:
+        return column_names(conn, sql, NAMING_BUDGET)
+    except Exception:
+        return None
+    finally:
+        idle.append(conn)
+
+
+class Sandbox:
+    """A session's private, writable copy of a dataset."""
+
+    def __init__(self, dataset_name):
+        self.dataset_name = dataset_name
+        # No statement cache: a reused statement is not compiled again, so the authorizer
+        # would not see it and ``is_read_only`` would find no actions
+        self.conn = open_sandbox(dataset_name, check_same_thread=False, isolation_level=None,
+                                 cached_statements=0)
+        self.conn.execute("PRAGMA temp_store = MEMORY")
+        extra_pages = config.SANDBOX_EXTRA_MB * 1024 * 1024 // _pragma(self.conn, "page_size")
+        self.conn.execute(f"PRAGMA max_page_count = {_pragma(self.conn, 'page_count') + extra_pages}")
+        self.conn.set_authorizer(self._authorize)
+        self.modified = False
+        self.last_used = time.monotonic()
+        self._lock = threading.Lock()
+        self._actions = set()
+
+    def _authorize(self, action, arg1, arg2, db_name, trigger):
+        if action == sqlite3.SQLITE_PRAGMA and arg1.lower() in ALLOWED_PRAGMAS:
+            # These only report on the database
+            action = sqlite3.SQLITE_READ
+        self._actions.add(action)
+        if action in (sqlite3.SQLITE_ATTACH, sqlite3.SQLITE_DETACH, sqlite3.SQLITE_PRAGMA):
+            return sqlite3.SQLITE_DENY
+        return sqlite3.SQLITE_OK
+
+    def is_read_only(self, sql):
+        """Whether ``sql`` only reads; it is compiled but not run."""
+        with self._lock:
+            self._actions.clear()
+            try:
+                self.conn.execute(f"EXPLAIN {sql}")
+            except sqlite3.Error:
+                # Let the real run report the error, in the sandbox if it got as far as
+                # anything but reading (the authorizer's own denials included)
+                return self._actions <= READ_ACTIONS
+            # Statements like VACUUM compile without any authorizer call
+            return bool(self._actions) and self._actions <= READ_ACTIONS
+
+    def apply(self, sql, budget=DEFAULT_BUDGET, stats=None):
+        """Run a statement that changes the sandbox; return ``(result, rows affected)``."""
+        if normalize_sql(sql).startswith("VACUUM"):
+            raise sqlite3.OperationalError("VACUUM is not available in the sandbox.")
+        with self._lock:
+            before = self.conn.total_changes
+            frame = run_query(self.conn, sql, budget, stats)
+            self.modified = True
+            return frame, self.conn.total_changes - before
+
+    def reset(self):
+        """Restore the pristine dataset, dropping temporary objects too."""
+        with self._lock:
+            if self.conn.in_transaction:
+                self.conn.rollback()
+            for kind, name in self.conn.execute("SELECT type, name FROM sqlite_temp_master "
+                                                "WHERE type IN ('table', 'view')").fetchall():
+                self.conn.execute(f'DROP {kind} IF EXISTS temp."{name}"')
+            _snapshot(self.dataset_name).backup(self.conn)
+            self.modified = False
+
+    def size_bytes(self):
+        return _pragma(self.conn, "page_count") * _pragma(self.conn, "page_size")
+
+
+class SandboxRegistry:
+    """Session sandboxes, dropped least recently used first.
+
+    An evicted sandbox is only forgotten, not closed, so a script run still
+    holding it finishes normally; its memory is freed with the last reference.
+    """
+
+    def __init__(self, max_sessions, idle_timeout):
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.evicted = 0
+        self._sandboxes = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, session_id, dataset_name):
+        key = (session_id, dataset_name)
+        with self._lock:
+            sandbox = self._sandboxes.pop(key, None) or Sandbox(dataset_name)
+            sandbox.last_used = time.monotonic()
+            self._sandboxes[key] = sandbox
+            self._evict()
+            return sandbox
+
+    def _evict(self):
+        idle_since = time.monotonic() - self.idle_timeout
+        while self._sandboxes:
+            oldest = next(iter(self._sandboxes.values()))
+            if len(self._sandboxes) <= self.max_sessions and oldest.last_used >= idle_since:
+                break
+            self._sandboxes.popitem(last=False)
+            self.evicted += 1
+
+    def metrics(self):
+        with self._lock:
+            sandboxes = list(self._sandboxes.values())
+        return {
+            "sandboxes": len(sandboxes),
+            "modified": sum(sandbox.modified for sandbox in sandboxes),
+            "bytes": sum(sandbox.size_bytes() for sandbox in sandboxes),
+            "evicted": self.evicted,
+        }
+
+
+@functools.lru_cache(maxsize=None)
+def get_sandboxes():
+    if config.SANDBOX_HEAP_LIMIT_MB:
+        # The soft heap limit is process-wide, so any connection can set it
+        conn = sqlite3.connect(":memory:")
+        conn.execute(f"PRAGMA soft_heap_limit = {config.SANDBOX_HEAP_LIMIT_MB * 1024 * 1024}")
+        conn.close()
+    return SandboxRegistry(config.SANDBOX_MAX_SESSIONS, config.SANDBOX_IDLE_TIMEOUT)
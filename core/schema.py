@@ -0,0 +1,116 @@
+"""Schema reference and ER diagram, read from the dataset itself.
+
+Tables, columns and foreign keys come from ``sqlite_master``,
+``PRAGMA table_info`` and ``PRAGMA foreign_key_list`` on a copy of the
+template database, so the diagram cannot drift from the real tables. Both
+the description and the rendered diagram are cached per dataset version.
+Graphviz is only imported when a diagram is first rendered.
+"""
+import functools
+from dataclasses import dataclass
+
+from core.datasets import get_dataset
+from core.sandbox import open_sandbox
+
+
+@dataclass(frozen=True)
+class Column:
+    name: str
+    type: str
+    primary_key: bool
+    references: str = None  # referenced table for foreign keys
+    example: object = None
+
+
+@dataclass(frozen=True)
+class Table:
+    name: str
+    columns: tuple
+
+
+def introspect(conn):
+    tables = []
+    for (table,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table' "
+                                 "AND name NOT LIKE 'sqlite_%' ORDER BY rowid").fetchall():
+        references = {row[3]: row[2] for row in conn.execute(f"PRAGMA foreign_key_list({table})")}
+        info = conn.execute(f"PRAGMA table_info({table})").fetchall()
+        first_row = conn.execute(f"SELECT * FROM {table} LIMIT 1").fetchone() or (None,) * len(info)
+        tables.append(Table(table, tuple(
+            Column(name, (type_ or "").lower(), bool(pk), references.get(name), example)
+            for (_, name, type_, _, _, pk), example in zip(info, first_row)
+        )))
+    return tuple(tables)
+
+
+@functools.lru_cache(maxsize=None)
+def _tables(dataset_name, version):
+    conn = open_sandbox(dataset_name)
+    try:
+        return introspect(conn)
+    finally:
+        conn.close()
+
+
+def get_tables(dataset_name):
+    return _tables(dataset_name, get_dataset(dataset_name).version)
+
+
+# --- Rendering ---
+def er_digraph(tables):
+    import graphviz
+
+    dot = graphviz.Digraph(comment="Database Schema")
+    dot.attr("node", shape="box", style="rounded,filled", color="#E0E0E0", fillcolor="#F8F8F8")
+    for table in tables:
+        lines = [table.name]
+        for column in table.columns:
+            marker = " (PK)" if column.primary_key else " (FK)" if column.references else ""
+            lines.append(f"- {column.name}{marker}")
+        dot.node(table.name, "\n".join(lines))
+    for table in tables:
+        for column in table.columns:
+            if column.references:
+                dot.edge(table.name, column.references, label=column.name)
+    return dot
+
+
+@functools.lru_cache(maxsize=None)
+def _er_diagram(dataset_name, version):
+    import graphviz
+
+    dot = er_digraph(_tables(dataset_name, version))
+    try:
+        return "svg", dot.pipe(format="svg").decode("utf-8")
+    except graphviz.ExecutableNotFound:
+        # No Graphviz binaries here; the browser renders the DOT source instead
+        return "dot", dot.source
+
+
+def er_diagram(dataset_name):
+    """``("svg", markup)`` or, without Graphviz installed, ``("dot", source)``."""
+    return _er_diagram(dataset_name, get_dataset(dataset_name).version)
+
+
+def _describe(column):
+    text = column.type or "any"
+    if column.primary_key:
+        return f"{text}, PK"
+    if column.references:
+        return f"{text} (FK to {column.references})"
+    if column.example is not None:
+        return f"{text} (e.g., {column.example!r})"
+    return text
+
+
+@functools.lru_cache(maxsize=None)
+def _schema_markdown(dataset_name, version):
+    blocks = []
+    for table in _tables(dataset_name, version):
+        lines = [f"**{table.name}**  "]
+        lines += [f"- {column.name}: {_describe(column)}  " for column in table.columns]
+        blocks.append("\n".join(lines))
+    return "\n\n".join(blocks)
+
+
+def schema_markdown(dataset_name):
+    return _schema_markdown(dataset_name, get_dataset(dataset_name).version)
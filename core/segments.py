@@ -0,0 +1,98 @@
+"""Closed days of the submission log, one Parquet file per day.
+
+The submission store keeps recent rows in its SQLite table (the open
+segment) and compacts every closed day into ``day=YYYY-MM-DD.parquet``.
+Its ``partitions`` table indexes the files by day and id range, so reading
+a date range opens only the files inside it. Files are replaced atomically
+and only ever read up to the ``max_id`` recorded in the index, so a file
+written by an interrupted compaction never shows rows twice.
+"""
+import functools
+import os
+
+# Arrow type of every column stored in a segment
+ARROW_TYPES = {
+    "id": "int64",
+    "timestamp": "string",
+    "name": "string",
+    "category": "string",
+    "task_index": "int64",
+    "query": "string",
+    "correct": "bool",
+    "score": "int64",
+    "elapsed_ms": "float64",
+    "rows_returned": "int64",
+    "vm_steps": "int64",
+    "query_plan": "string",
+}
+
+
+def arrow_schema(columns):
+    import pyarrow as pa
+
+    return pa.schema([(column, pa.type_for_alias(ARROW_TYPES[column])) for column in columns])
+
+
+def record_batch(schema, rows):
+    """Arrow batch from row tuples in schema order; SQLite's 0/1 verdicts become booleans."""
+    import pyarrow as pa
+
+    columns = [list(column) for column in zip(*rows)] or [[] for _ in schema]
+    if "correct" in schema.names:
+        correct = schema.get_field_index("correct")
+        columns[correct] = [None if value is None else bool(value) for value in columns[correct]]
+    return pa.RecordBatch.from_arrays([pa.array(column, type=field.type)
+                                       for column, field in zip(columns, schema)], schema=schema)
+
+
+class SegmentDirectory:
+    def __init__(self, path, columns):
+        self.path = path
+        self.columns = columns
+
+    @functools.cached_property
+    def schema(self):
+        return arrow_schema(self.columns)
+
+    def file(self, day):
+        return os.path.join(self.path, f"day={day}.parquet")
+
+    def read(self, day, max_id, after_id=0, names=(), categories=()):
+        """Rows of one day as an Arrow table, optionally only some students or categories."""
+        import pyarrow.parquet as pq
+
+        filters = [("id", "<=", max_id), ("id", ">", after_id)]
+        if names:
+            filters.append(("name", "in", list(names)))
+        if categories:
+            filters.append(("category", "in", list(categories)))
+        return pq.read_table(self.file(day), schema=self.schema, filters=filters)
+
+    def merge(self, day, max_id, rows):
+        """Add ``rows`` to the day's file; ``max_id`` is None if there is no file yet."""
+        import pyarrow as pa
+
+        table = pa.Table.from_batches([record_batch(self.schema, rows)])
+        if max_id is not None:
+            table = pa.concat_tables([self.read(day, max_id), table])
+        self._write(day, table)
+
+    def update(self, day, max_id, column, values):
+        """Overwrite ``column`` in the day's file for the rows whose id is a key of ``values``."""
+        import pyarrow as pa
+
+        table = self.read(day, max_id)
+        ids = table.column("id").to_pylist()
+        index = table.schema.get_field_index(column)
+        current = table.column(index).to_pylist()
+        updated = [values.get(row_id, value) for row_id, value in zip(ids, current)]
+        self._write(day, table.set_column(index, column, pa.array(updated, type=table.schema.field(index).type)))
+
+    def _write(self, day, table):
+        import pyarrow.parquet as pq
+
+        os.makedirs(self.path, exist_ok=True)
+        path = self.file(day)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        pq.write_table(table, tmp_path)
+        os.replace(tmp_path, path)
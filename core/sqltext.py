@@ -0,0 +1,223 @@
+"""Textual normalization of SQL queries.
+
+``normalize_sql`` maps queries that differ only in keyword or identifier
+case, whitespace, comments or trailing semicolons to the same text. String
+literals and quoted identifiers are kept exactly as written. The result is
+what grading sees anyway: SQLite identifiers are case-insensitive and the
+comparison engine ignores case and whitespace in column names.
+
+``fingerprint`` goes further and hashes a canonical form that also ignores
+table aliases, backtick and bracket quoting, number formatting and a few
+keyword synonyms, while keeping everything that can change the result.
+Double-quoted tokens are kept as written: SQLite reads ``"Hungary"`` as a
+string literal when no column has that name.
+"""
+import functools
+import hashlib
+import re
+
+_TOKEN = re.compile(r"""
+      (?P<literal>'(?:[^']|'')*'|"(?:[^"]|"")*"|`[^`]*`|\[[^\]]*\])
+    | (?P<comment>--[^\n]*|/\*.*?(?:\*/|$))
+    | (?P<space>\s+)
+    | (?P<other>[^'"`\[\s\-/]+|[\-/])
+""", re.VERBOSE | re.DOTALL)
+
+# Whitespace next to these never changes a query's meaning
+TIGHT = "(),;"
+
+
+def tokens(sql):
+    """Split ``sql`` into (kind, text) tokens; comments count as whitespace."""
+    for match in _TOKEN.finditer(sql):
+        kind = match.lastgroup
+        if kind == "space" or kind == "comment":
+            yield "space", " "
+        else:
+            yield kind, match.group()
+
+
+def normalize_sql(sql):
+    parts = []
+    for kind, text in tokens(sql):
+        if kind == "space":
+            if parts and parts[-1] != " " and parts[-1][-1] not in TIGHT:
+                parts.append(" ")
+            continue
+        if kind != "literal":
+            text = text.upper()
+            if parts and parts[-1] == " " and text[0] in TIGHT:
+                parts.pop()
+        parts.append(text)
+    return "".join(parts).strip().rstrip(";").rstrip()
+
+
+# --- Fingerprints ---
+_LEXEME = re.compile(r"""
+      (?P<string>'(?:[^']|'')*')
+    | (?P<quoted>"(?:[^"]|"")*"|`[^`]*`|\[[^\]]*\])
+    | (?P<space>\s+|--[^\n]*|/\*.*?(?:\*/|$))
+    | (?P<number>0[xX][0-9a-fA-F]+|(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)
+    | (?P<word>[A-Za-z_][A-Za-z0-9_$]*)
+    | (?P<op><>|!=|==|<=|>=|\|\||<<|>>|.)
+""", re.VERBOSE | re.DOTALL)
+_IDENTIFIER = re.compile(r"[A-Za-z_][A-Za-z0-9_]*$")
+_SYNONYMS = {"==": "=", "<>": "!="}
+
+# Words that end a FROM clause or follow a table instead of an alias
+_FROM_END = {"WHERE", "GROUP", "ORDER", "LIMIT", "HAVING", "WINDOW", "UNION", "EXCEPT", "INTERSECT",
+             "ON", "USING", "SELECT", "VALUES", "RETURNING", "SET"}
+_NOT_ALIAS = _FROM_END | {"JOIN", "INNER", "LEFT", "RIGHT", "FULL", "CROSS", "NATURAL", "OUTER",
+                          "INDEXED", "NOT", "AS"}
+
+
+def _unquote(kind, text):
+    """A backtick or bracket quoted name is the bare word; these never become strings."""
+    if kind == "quoted" and text[0] != '"' and _IDENTIFIER.match(text[1:-1]):
+        return "word", text[1:-1]
+    return kind, text
+
+
+def _lexemes(sql):
+    """Canonical (kind, text) lexemes: case, quoting and number format removed."""
+    result = []
+    for match in _LEXEME.finditer(sql):
+        kind, text = _unquote(match.lastgroup, match.group())
+        if kind == "space":
+            continue
+        if kind == "word":
+            text = text.upper()
+        elif kind == "number":
+            if text[:2].lower() == "0x":
+                text = str(int(text, 16))
+            elif any(c in text for c in ".eE"):
+                text = repr(float(text))
+            else:
+                text = str(int(text))
+        elif kind == "op":
+            text = _SYNONYMS.get(text, text)
+        result.append((kind, text))
+    while result and result[-1] == ("op", ";"):
+        result.pop()
+    return result
+
+
+def _drop_noise_words(lexemes):
+    """INNER JOIN is JOIN and LEFT OUTER JOIN is LEFT JOIN."""
+    result = []
+    for i, (kind, text) in enumerate(lexemes):
+        following = lexemes[i + 1][1] if i + 1 < len(lexemes) else None
+        if kind == "word" and following == "JOIN" and (text == "INNER" or text == "OUTER"):
+            continue
+        result.append((kind, text))
+    return result
+
+
+def _resolve_aliases(lexemes):
+    """Replace table aliases with the table name (numbered if a table repeats)."""
+    declarations = []  # (table position, alias, lexemes taken by the alias)
+    expect_table = in_from = False
+    for i, (kind, text) in enumerate(lexemes):
+        if expect_table:
+            expect_table = False
+            after = lexemes[i + 1:i + 3]
+            if kind != "word" or (after and after[0] == ("op", ".")):
+                continue
+            if len(after) == 2 and after[0] == ("word", "AS") and after[1][0] == "word":
+                declarations.append((i, after[1][1], 2))
+            elif after and after[0][0] == "word" and after[0][1] not in _NOT_ALIAS:
+                declarations.append((i, after[0][1], 1))
+            else:
+                declarations.append((i, None, 0))
+        elif kind == "word" and text in ("FROM", "JOIN"):
+            expect_table = in_from = True
+        elif kind == "word" and text in _FROM_END or text in "()":
+            in_from = False
+        elif in_from and text == ",":
+            expect_table = True
+
+    tables = [lexemes[i][1] for i, _, _ in declarations]
+    aliases = {}
+    seen = {}
+    for i, alias, _ in declarations:
+        table = lexemes[i][1]
+        seen[table] = seen.get(table, 0) + 1
+        if alias is None:
+            continue
+        if alias in aliases or (alias in tables and alias != table):
+            # Ambiguous; leave the query as written
+            return lexemes
+        aliases[alias] = table if tables.count(table) == 1 else f"{table}#{seen[table]}"
+
+    skip = {i + 1 + k for i, alias, taken in declarations if alias is not None for k in range(taken)}
+    result = []
+    for i, (kind, text) in enumerate(lexemes):
+        if i in skip:
+            continue
+        following = lexemes[i + 1] if i + 1 < len(lexemes) else None
+        if kind == "word" and text in aliases and following == ("op", "."):
+            text = aliases[text]
+        result.append((kind, text))
+    return result
+
+
+def canonical_sql(sql):
+    """Canonical text of ``sql``: equal texts return equal rows."""
+    return " ".join(text for _, text in _resolve_aliases(_drop_noise_words(_lexemes(sql))))
+
+
+def _is_column_ref(item):
+    """``*``, ``col``, ``t.col`` or ``t.*``: SQLite names these after the column alone."""
+    if not all(kind == "word" or text in ".*" for kind, text in item):
+        return False
+    separators = [text for _, text in item[1::2]]
+    return separators == ["."] * len(separators)
+
+
+def header_key(sql):
+    """Spelling of the result columns whose names depend on how they are written.
+
+    An unaliased expression is named after its exact text, so its spelling
+    (up to case and whitespace, which grading ignores) is part of the answer.
+    """
+    lexemes = []
+    for match in _LEXEME.finditer(sql):
+        kind, text = _unquote(match.lastgroup, match.group())
+        if kind != "space":
+            lexemes.append((kind, text.upper() if kind == "word" else text))
+    depth = 0
+    items, item, in_select = [], [], False
+    for kind, text in lexemes:
+        if text == "(":
+            depth += 1
+        elif text == ")":
+            depth -= 1
+        if depth == 0 and kind == "word":
+            if not in_select and text == "SELECT" and not items:
+                in_select = True
+                continue
+            if in_select and (text == "FROM" or text in _FROM_END):
+                break
+            if in_select and not item and text in ("DISTINCT", "ALL"):
+                continue
+        if not in_select:
+            continue
+        if depth == 0 and text == ",":
+            items.append(item)
+            item = []
+        else:
+            item.append((kind, text))
+    items.append(item)
+    spelled = []
+    for item in items:
+        if not item or _is_column_ref(item) or (len(item) > 2 and item[-2] == ("word", "AS")):
+            continue
+        spelled.append("".join(text for _, text in item))
+    return ",".join(spelled)
+
+
+@functools.lru_cache(maxsize=65536)
+def fingerprint(sql):
+    """Short hash of the canonical form; equal fingerprints mean equal answers."""
+    key = f"{canonical_sql(sql)}\0{header_key(sql)}"
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()[:16]
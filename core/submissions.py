@@ -0,0 +1,523 @@
+"""Submission log shared by both lesson pages.
+
+Submissions live in a WAL-mode SQLite file with a single schema. ``record``
+only puts the row on a queue; a background writer thread drains the queue
+and group-commits everything that has piled up in one transaction, so the
+student request path never waits on disk I/O.
+
+The SQLite table is only the open segment: the writer periodically moves
+closed days into one Parquet file per day (see ``core.segments``), and
+reads by date range open just the partitions in that range.
+
+The same transaction keeps per-student, per-task and per-student-task
+summary tables up to date, so the teacher's analytics read a few rows per
+student and task instead of scanning the whole log.
+"""
+import atexit
+import csv
+import functools
+import itertools
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from datetime import date, datetime
+
+import pandas as pd
+
+from core import config
+from core.segments import SegmentDirectory
+from core.sqltext import fingerprint
+
+logger = logging.getLogger(__name__)
+
+LEGACY_COLUMNS = ["timestamp", "name", "category", "task_index", "query", "correct", "score"]
+# Execution metrics, added after the legacy columns
+METRIC_COLUMNS = {
+    "elapsed_ms": "REAL",
+    "rows_returned": "INTEGER",
+    "vm_steps": "INTEGER",
+    "query_plan": "TEXT",
+}
+COLUMNS = LEGACY_COLUMNS + list(METRIC_COLUMNS)
+# Columns of compacted partitions, which keep the row id
+SEGMENT_COLUMNS = ["id"] + COLUMNS
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS submissions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    timestamp TEXT NOT NULL,
+    name TEXT,
+    category TEXT,
+    task_index INTEGER,
+    query TEXT,
+    correct INTEGER,
+    score INTEGER,
+    elapsed_ms REAL,
+    rows_returned INTEGER,
+    vm_steps INTEGER,
+    query_plan TEXT
+);
+CREATE INDEX IF NOT EXISTS submissions_timestamp ON submissions (timestamp);
+-- Closed days moved out of the submissions table into Parquet files
+CREATE TABLE IF NOT EXISTS partitions (
+    day TEXT PRIMARY KEY,
+    rows INTEGER NOT NULL,
+    min_id INTEGER NOT NULL,
+    max_id INTEGER NOT NULL
+);
+"""
+
+# --- Incremental analytics ---
+SUMMARY_SCHEMA = """
+CREATE TABLE IF NOT EXISTS student_summary (
+    name TEXT PRIMARY KEY,
+    attempts INTEGER NOT NULL,
+    correct INTEGER NOT NULL,
+    solved INTEGER NOT NULL DEFAULT 0,
+    first_seen TEXT,
+    last_seen TEXT
+);
+CREATE TABLE IF NOT EXISTS task_summary (
+    category TEXT,
+    task_index INTEGER,
+    attempts INTEGER NOT NULL,
+    correct INTEGER NOT NULL,
+    students INTEGER NOT NULL DEFAULT 0,
+    solvers INTEGER NOT NULL DEFAULT 0,
+    attempts_to_solve INTEGER NOT NULL DEFAULT 0,
+    seconds_to_solve REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (category, task_index)
+);
+CREATE TABLE IF NOT EXISTS student_task_summary (
+    name TEXT,
+    category TEXT,
+    task_index INTEGER,
+    attempts INTEGER NOT NULL,
+    first_attempt TEXT,
+    first_correct TEXT,
+    attempts_to_solve INTEGER,
+    PRIMARY KEY (name, category, task_index)
+);
+CREATE TRIGGER IF NOT EXISTS student_task_started AFTER INSERT ON student_task_summary
+BEGIN
+    UPDATE task_summary SET students = students + 1,
+                            solvers = solvers + (NEW.first_correct IS NOT NULL),
+                            attempts_to_solve = attempts_to_solve + COALESCE(NEW.attempts_to_solve, 0)
+    WHERE category = NEW.category AND task_index = NEW.task_index;
+    UPDATE student_summary SET solved = solved + (NEW.first_correct IS NOT NULL) WHERE name = NEW.name;
+END;
+CREATE TRIGGER IF NOT EXISTS student_task_solved AFTER UPDATE OF first_correct ON student_task_summary
+WHEN OLD.first_correct IS NULL AND NEW.first_correct IS NOT NULL
+BEGIN
+    UPDATE task_summary SET solvers = solvers + 1,
+                            attempts_to_solve = attempts_to_solve + NEW.attempts_to_solve,
+                            seconds_to_solve = seconds_to_solve + COALESCE(
+                                (julianday(NEW.first_correct) - julianday(NEW.first_attempt)) * 86400, 0)
+    WHERE category = NEW.category AND task_index = NEW.task_index;
+    UPDATE student_summary SET solved = solved + 1 WHERE name = NEW.name;
+END;
+"""
+
+# Run in this order for every submission, with its name, category, task_index, correct and timestamp
+SUMMARY_UPSERTS = [
+    """INSERT INTO student_summary (name, attempts, correct, first_seen, last_seen)
+       VALUES (:name, 1, :correct, :timestamp, :timestamp)
+       ON CONFLICT (name) DO UPDATE SET attempts = attempts + 1, correct = correct + excluded.correct,
+                                        last_seen = excluded.last_seen""",
+    """INSERT INTO task_summary (category, task_index, attempts, correct)
+       VALUES (:category, :task_index, 1, :correct)
+       ON CONFLICT (category, task_index) DO UPDATE SET attempts = attempts + 1,
+                                                        correct = correct + excluded.correct""",
+    """INSERT INTO student_task_summary (name, category, task_index, attempts, first_attempt, first_correct,
+                                        attempts_to_solve)
+       VALUES (:name, :category, :task_index, 1, :timestamp,
+               CASE WHEN :correct THEN :timestamp END, CASE WHEN :correct THEN 1 END)
+       ON CONFLICT (name, category, task_index) DO UPDATE SET
+           attempts = attempts + 1,
+           first_correct = COALESCE(first_correct, excluded.first_correct),
+           attempts_to_solve = COALESCE(attempts_to_solve, CASE WHEN excluded.first_correct IS NOT NULL
+                                                                THEN attempts + 1 END)""",
+]
+SUMMARY_TABLES = ["student_summary", "task_summary", "student_task_summary"]
+
+INSERT_SQL = f"INSERT INTO submissions ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})"
+
+# Rows committed in a single transaction at most
+MAX_BATCH = 500
+# First wait before writing a batch again after the database was locked or busy (seconds, doubling up to 30)
+WRITE_RETRY_DELAY = 0.5
+# Attempts at a batch once the store is closing; before that a locked database is retried until it frees up
+CLOSING_WRITE_ATTEMPTS = 5
+# Rows per in-memory chunk of a SubmissionTail
+TAIL_CHUNK_ROWS = 50_000
+
+
+def _day_range(since, until):
+    """SQL condition on ``timestamp`` for a range of ISO dates, both ends inclusive."""
+    clauses, params = [], []
+    if since:
+        clauses.append("timestamp >= ?")
+        params.append(since)
+    if until:
+        clauses.append("timestamp < date(?, '+1 day')")
+        params.append(until)
+    return clauses, params
+
+
+class SubmissionStore:
+    def __init__(self, path, segment_dir=None, compact_interval=0):
+        self.path = path
+        self.compact_interval = compact_interval
+        self._segments = SegmentDirectory(segment_dir or f"{path}.segments", SEGMENT_COLUMNS)
+        self._queue = queue.Queue()
+        self._init_schema()
+        self._writer = threading.Thread(target=self._write_loop, name="submission-writer", daemon=True)
+        self._writer.start()
+        atexit.register(self.close)
+
+    def connect(self):
+        conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _init_schema(self):
+        conn = self.connect()
+        try:
+            created = conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'submissions'").fetchone() is None
+            conn.executescript(SCHEMA)
+            existing = {row[1] for row in conn.execute("PRAGMA table_info(submissions)")}
+            for column, column_type in METRIC_COLUMNS.items():
+                if column not in existing:
+                    conn.execute(f"ALTER TABLE submissions ADD COLUMN {column} {column_type}")
+            if created and os.path.isfile(config.LEGACY_SUBMISSIONS_CSV):
+                self._import_csv(conn, config.LEGACY_SUBMISSIONS_CSV)
+            summarized = conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'student_summary'").fetchone()
+            conn.executescript(SUMMARY_SCHEMA)
+            conn.commit()
+        finally:
+            conn.close()
+        if not summarized:
+            # Summaries are new to this database (or it was just imported)
+            self.rebuild_summaries()
+
+    @staticmethod
+    def _import_csv(conn, csv_path):
+        # Both legacy header variants (task_type / category) share the column order
+        with open(csv_path, newline="", encoding="utf-8") as f:
+            rows = [row for row in csv.reader(f) if len(row) == len(LEGACY_COLUMNS)]
+        rows = [
+            (timestamp, name, category, int(task_index), query, correct == "True", int(score))
+            for timestamp, name, category, task_index, query, correct, score in rows[1:]
+            if task_index.isdigit() and score.lstrip("-").isdigit()
+        ]
+        conn.executemany(
+            f"INSERT INTO submissions ({', '.join(LEGACY_COLUMNS)}) "
+            f"VALUES ({', '.join('?' * len(LEGACY_COLUMNS))})", rows)
+
+    # --- Writing ---
+    def record(self, name, category, task_index, query, correct, score, stats=None):
+        metrics = (None, None, None, None)
+        if stats is not None:
+            metrics = (stats.elapsed_ms, stats.rows, stats.vm_steps, stats.plan)
+        self._queue.put(
+            (datetime.now().isoformat(), name, category, task_index, query, bool(correct), score) + metrics)
+
+    def flush(self):
+        """Block until every queued submission has been committed."""
+        self._queue.join()
+
+    def close(self):
+        if self._writer.is_alive():
+            self._queue.put(None)
+            self._writer.join()
+
+    def _write_loop(self):
+        conn = self.connect()
+        next_compaction = time.monotonic()
+        running = True
+        while running:
+            if self.compact_interval and time.monotonic() >= next_compaction:
+                next_compaction = time.monotonic() + self.compact_interval
+                try:
+                    self.compact()
+                except Exception:
+                    # Rows stay in the open segment until the next attempt
+                    logger.exception("Failed to compact submissions")
+            # Wake up for the next compaction even when nobody submits
+            timeout = max(next_compaction - time.monotonic(), 0) if self.compact_interval else None
+            try:
+                batch = [self._queue.get(timeout=timeout)]
+            except queue.Empty:
+                continue
+            while len(batch) < MAX_BATCH:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            rows = [row for row in batch if row is not None]
+            running = len(rows) == len(batch)
+            try:
+                if rows:
+                    self._commit(conn, rows, retry=running)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+        conn.close()
+
+    def _commit(self, conn, rows, retry=True):
+        """Write ``rows`` in one transaction, waiting out a locked or busy database.
+
+        The batch is retried with a growing delay, so rows are only lost when
+        the store is closing and the database stays unavailable. A row SQLite
+        rejects is logged and skipped without dropping the rest of the batch.
+        """
+        for attempt in itertools.count(1):
+            try:
+                with conn:
+                    conn.executemany(INSERT_SQL, rows)
+                    self._summarize(conn, rows)
+                return
+            except sqlite3.OperationalError:
+                if not retry and attempt >= CLOSING_WRITE_ATTEMPTS:
+                    logger.exception("Failed to write %d submissions", len(rows))
+                    return
+                delay = min(WRITE_RETRY_DELAY * 2 ** (attempt - 1), 30)
+                logger.warning("Writing %d submissions failed, retrying in %gs", len(rows), delay,
+                               exc_info=True)
+                time.sleep(delay)
+            except sqlite3.Error:
+                if len(rows) == 1:
+                    logger.exception("Failed to write a submission: %r", rows[0])
+                    return
+                for row in rows:
+                    self._commit(conn, [row], retry)
+                return
+
+    @staticmethod
+    def _summarize(conn, rows):
+        for timestamp, name, category, task_index, _, correct, *_ in rows:
+            params = {"name": name, "category": category, "task_index": task_index,
+                      "correct": int(bool(correct)), "timestamp": timestamp}
+            for statement in SUMMARY_UPSERTS:
+                conn.execute(statement, params)
+
+    def rebuild_summaries(self):
+        """Recompute the summary tables from the log, e.g. after verdicts were changed."""
+        conn = self.connect()
+        try:
+            with conn:
+                for table in SUMMARY_TABLES:
+                    conn.execute(f"DELETE FROM {table}")
+                for rows in self.iter_rows():
+                    self._summarize(conn, [row[1:] for row in rows])
+        finally:
+            conn.close()
+
+    def update_verdicts(self, changes):
+        """Set ``correct`` for ``(id, correct)`` pairs, in whichever segment each row lives."""
+        changes = dict(changes)
+        conn = self.connect()
+        try:
+            with conn:
+                conn.execute("BEGIN IMMEDIATE")
+                conn.executemany("UPDATE submissions SET correct = ? WHERE id = ?",
+                                 [(correct, submission_id) for submission_id, correct in changes.items()])
+                for day, min_id, max_id in conn.execute("SELECT day, min_id, max_id FROM partitions").fetchall():
+                    changed = {submission_id: correct for submission_id, correct in changes.items()
+                               if min_id <= submission_id <= max_id}
+                    if changed:
+                        self._segments.update(day, max_id, "correct", changed)
+        finally:
+            conn.close()
+        self.rebuild_summaries()
+
+    # --- Compaction ---
+    def compact(self, before=None):
+        """Move the rows of days before ``before`` (default: today) into Parquet partitions.
+
+        Returns the days compacted.
+        """
+        conn = self.connect()
+        try:
+            days = [day for (day,) in conn.execute(
+                "SELECT DISTINCT substr(timestamp, 1, 10) FROM submissions WHERE timestamp < ?",
+                (before or date.today().isoformat(),))]
+            for day in days:
+                self._compact_day(conn, day)
+        finally:
+            conn.close()
+        return days
+
+    def _compact_day(self, conn, day):
+        # The write lock is held until the index points at the new file and the rows are gone
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            clauses, params = _day_range(day, day)
+            rows = conn.execute(f"SELECT {', '.join(SEGMENT_COLUMNS)} FROM submissions "
+                                f"WHERE {' AND '.join(clauses)} ORDER BY id", params).fetchall()
+            if not rows:
+                return
+            partition = conn.execute("SELECT rows, min_id, max_id FROM partitions WHERE day = ?", (day,)).fetchone()
+            count, min_id, max_id = partition or (0, rows[0][0], None)
+            self._segments.merge(day, max_id, rows)
+            conn.execute("INSERT OR REPLACE INTO partitions (day, rows, min_id, max_id) VALUES (?, ?, ?, ?)",
+                         (day, count + len(rows), min(min_id, rows[0][0]), rows[-1][0]))
+            conn.execute(f"DELETE FROM submissions WHERE {' AND '.join(clauses)} AND id <= ?",
+                         params + [rows[-1][0]])
+
+    # --- Reading ---
+    def iter_rows(self, since=None, until=None, names=(), categories=(), after_id=0, chunk_rows=MAX_BATCH):
+        """Matching submissions as lists of ``(id, *COLUMNS)`` tuples, oldest first.
+
+        Only partitions of days in ``since``..``until`` (ISO dates, inclusive)
+        are opened. Partitions and the open segment are read in one
+        transaction, so rows compacted meanwhile are seen exactly once.
+        """
+        clauses, params = _day_range(since, until)
+        clauses.append("id > ?")
+        params.append(after_id)
+        for column, values in (("name", names), ("category", categories)):
+            if values:
+                clauses.append(f"{column} IN ({', '.join('?' * len(values))})")
+                params += values
+        conn = self.connect()
+        try:
+            conn.execute("BEGIN")
+            partitions = conn.execute(
+                "SELECT day, max_id FROM partitions WHERE max_id > ? AND day >= ? AND day <= ? ORDER BY min_id",
+                (after_id, (since or "")[:10], (until or "9999")[:10])).fetchall()
+            for day, max_id in partitions:
+                table = self._segments.read(day, max_id, after_id, names, categories)
+                for batch in table.to_batches(chunk_rows):
+                    yield list(zip(*(column.to_pylist() for column in batch.columns)))
+            cursor = conn.execute(f"SELECT {', '.join(SEGMENT_COLUMNS)} FROM submissions "
+                                  f"WHERE {' AND '.join(clauses)} ORDER BY id", params)
+            while rows := cursor.fetchmany(chunk_rows):
+                yield rows
+        finally:
+            conn.rollback()
+            conn.close()
+
+    def read_frame(self, after_id=0, since=None, until=None):
+        """Submissions with a row id above ``after_id``, indexed by row id."""
+        rows = [row for chunk in self.iter_rows(since, until, after_id=after_id) for row in chunk]
+        frame = pd.DataFrame.from_records(rows, columns=SEGMENT_COLUMNS, index="id", coerce_float=True)
+        frame["correct"] = frame["correct"].astype(bool)
+        return frame
+
+    def student_summary(self):
+        """Attempts, accuracy and tasks solved per student, best first."""
+        conn = self.connect()
+        try:
+            return pd.read_sql_query(
+                "SELECT name, attempts, correct, solved, 1.0 * correct / attempts AS accuracy, "
+                "first_seen, last_seen FROM student_summary ORDER BY solved DESC, accuracy DESC, name", conn)
+        finally:
+            conn.close()
+
+    def task_summary(self):
+        """Per task: attempts, success rate, share of students who solved it and the effort it took."""
+        conn = self.connect()
+        try:
+            return pd.read_sql_query(
+                "SELECT category, task_index, attempts, 1.0 * correct / attempts AS success_rate, "
+                "students, solvers, 1.0 * solvers / students AS solve_rate, "
+                "1.0 * attempts_to_solve / NULLIF(solvers, 0) AS attempts_to_solve, "
+                "seconds_to_solve / NULLIF(solvers, 0) / 60 AS minutes_to_solve "
+                "FROM task_summary ORDER BY category, task_index", conn)
+        finally:
+            conn.close()
+
+
+def hardest_tasks(task_summary, count=5):
+    """Tasks the fewest students solved, then those that took the most attempts."""
+    return task_summary.sort_values(["solve_rate", "attempts_to_solve"], ascending=[True, False]).head(count)
+
+
+class SubmissionTail:
+    """In-memory copy of the submission log, extended with new rows only.
+
+    Each ``refresh`` reads just the rows past the last seen id. Rows are kept
+    as a list of frames of about ``TAIL_CHUNK_ROWS`` rows, so new rows never
+    copy the history and ``rows`` concatenates only the chunks it spans.
+    """
+
+    def __init__(self, store):
+        self._store = store
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Forget the cached rows, e.g. after existing submissions were updated."""
+        with self._lock:
+            self.last_id = 0
+            self._chunks = []
+            self._empty = None
+
+    def __len__(self):
+        return sum(len(chunk) for chunk in self._chunks)
+
+    def refresh(self):
+        """Read the rows submitted since the last refresh; returns the number of rows held."""
+        with self._lock:
+            new_rows = self._store.read_frame(after_id=self.last_id)
+            if self._empty is None:
+                self._empty = new_rows.iloc[:0]
+            if len(new_rows):
+                self.last_id = int(new_rows.index[-1])
+                # Small refreshes fill up the last chunk instead of piling up tiny frames
+                if self._chunks and len(self._chunks[-1]) < TAIL_CHUNK_ROWS:
+                    new_rows = pd.concat([self._chunks.pop(), new_rows])
+                self._chunks.append(new_rows)
+            return len(self)
+
+    def rows(self, start, stop):
+        """Rows ``start`` to ``stop`` of the log in submission order."""
+        with self._lock:
+            chunks = list(self._chunks)
+        offset, parts = 0, []
+        for chunk in chunks:
+            if offset >= stop:
+                break
+            if offset + len(chunk) > start:
+                parts.append(chunk.iloc[max(start - offset, 0):stop - offset])
+            offset += len(chunk)
+        return pd.concat(parts) if parts else self._empty
+
+    def frame(self):
+        """The whole log as one frame."""
+        return self.rows(0, len(self))
+
+
+def answer_clusters(frame):
+    """Submissions grouped into distinct answers per task by query fingerprint.
+
+    Each query text is fingerprinted once, however often it was submitted.
+    """
+    codes, queries = pd.factorize(frame["query"].fillna(""))
+    keys = pd.Index([fingerprint(query) for query in queries]).take(codes)
+    grouped = frame.assign(answer=keys).groupby(["category", "task_index", "answer"], sort=False)
+    clusters = grouped.agg(
+        submissions=("query", "size"),
+        students=("name", "nunique"),
+        correct=("correct", "mean"),
+        example=("query", "first"),
+    ).reset_index()
+    return clusters.sort_values(["category", "task_index", "submissions"], ascending=[True, True, False],
+                                ignore_index=True)
+
+
+@functools.lru_cache(maxsize=None)
+def get_store():
+    return SubmissionStore(config.SUBMISSIONS_DB, config.SUBMISSIONS_SEGMENTS, config.SUBMISSIONS_COMPACT_INTERVAL)
+
+
+@functools.lru_cache(maxsize=None)
+def get_tail():
+    return SubmissionTail(get_store())
@@ -0,0 +1,387 @@
+"""Streamlit widgets shared by the lesson pages."""
+import pandas as pd
+import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+from core import config
+from core.charts import chart_data
+from core.execution import DEFAULT_BUDGET, QueryBudgetExceeded, QueryStats
+from core.executor import count_rows, execute, fetch_page, get_pool
+from core.export import FORMATS, ExportFilter, export_file
+from core.resultcache import get_result_cache
+from core.sandbox import get_sandboxes
+from core.schema import er_diagram
+from core.grading import verdicts
+from core.leaderboard import get_leaderboard
+from core.progress import get_progress_store
+from core.submissions import answer_clusters, get_store, get_tail, hardest_tasks
+
+
+def session_sandbox(dataset_name):
+    """This session's persistent, writable sandbox for ``dataset_name``."""
+    ctx = get_script_run_ctx()
+    return get_sandboxes().get(ctx.session_id if ctx else None, dataset_name)
+
+
+def start_result(sql_query, sandbox):
+    """Remember the query for the result viewer.
+
+    Statements that change the sandbox run here, exactly once; the viewer
+    then shows their outcome instead of running them again on every rerun.
+    Reads are fetched a page at a time, and each page only when it is shown.
+    """
+    result = {"sql": sql_query, "page": 0, "count": None, "write": None, "fetched": None}
+    if not sandbox.is_read_only(sql_query):
+        stats = QueryStats()
+        try:
+            frame, affected = sandbox.apply(sql_query, stats=stats)
+        except QueryBudgetExceeded as e:
+            result["write"] = {"error": f"⏱️ {e}"}
+        except Exception as e:
+            result["write"] = {"error": f"⚠️ Error: {e}"}
+        else:
+            result["write"] = {"frame": frame, "affected": affected, "stats": stats}
+    st.session_state.result = result
+
+
+def clear_result():
+    st.session_state.pop("result", None)
+
+
+def result_frame(dataset_name, sandbox, stats, budget=DEFAULT_BUDGET):
+    """Full result of the last run query, for grading and charts."""
+    result = st.session_state.result
+    if result["write"] is not None:
+        vars(stats).update(vars(result["write"]["stats"]))
+        return result["write"]["frame"]
+    return execute(dataset_name, result["sql"], sandbox.conn, budget, stats, pristine=not sandbox.modified)
+
+
+def shown_result():
+    """The last read query's whole result when its shown first page holds all of it, else None."""
+    result = st.session_state.get("result")
+    fetched = result and result["fetched"]
+    if fetched and fetched["page"] == 0 and "error" not in fetched and not fetched["has_more"]:
+        return fetched["frame"]
+    return None
+
+
+def show_result_page(sandbox):
+    """Render the current page of the last run query; return False on error."""
+    result = st.session_state.get("result")
+    if not result:
+        return False
+
+    write = result["write"]
+    if write is not None:
+        if "error" in write:
+            st.error(write["error"])
+            return False
+        if len(write["frame"].columns):
+            st.dataframe(write["frame"], use_container_width=True)
+        st.info(f"✏️ {write['affected']:,} rows affected")
+        return True
+
+    # Pages and counts run in the worker pool too, unless the student has written to the sandbox
+    where = {"conn": sandbox.conn, "pristine": not sandbox.modified}
+    fetched = result["fetched"]
+    if fetched is None or fetched["page"] != result["page"]:
+        # Other widgets rerun the script too; only a new page runs the query again
+        fetched = result["fetched"] = {"page": result["page"]}
+        try:
+            fetched["frame"], fetched["has_more"] = fetch_page(sandbox.dataset_name, result["sql"],
+                                                               result["page"], **where)
+        except QueryBudgetExceeded as e:
+            fetched["error"] = f"⏱️ {e}"
+        except Exception as e:
+            fetched["error"] = f"⚠️ Error: {e}"
+    if "error" in fetched:
+        st.error(fetched["error"])
+        return False
+    page_df, has_more = fetched["frame"], fetched["has_more"]
+
+    st.dataframe(page_df, use_container_width=True)
+
+    first_row = result["page"] * config.RESULT_PAGE_SIZE
+    if result["count"] is None and not has_more:
+        result["count"] = first_row + len(page_df)
+    total = "?" if result["count"] is None else f"{result['count']:,}"
+    if len(page_df):
+        st.caption(f"Rows {first_row + 1:,}–{first_row + len(page_df):,} of {total}")
+
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        if st.button("⬅️ Previous page", disabled=result["page"] == 0):
+            result["page"] -= 1
+            st.rerun()
+    with col2:
+        if st.button("Next page ➡️", disabled=not has_more):
+            result["page"] += 1
+            st.rerun()
+    with col3:
+        if result["count"] is None and st.button("🔢 Count all rows"):
+            try:
+                result["count"] = count_rows(sandbox.dataset_name, result["sql"], **where)
+            except QueryBudgetExceeded as e:
+                st.error(f"⏱️ {e}")
+            else:
+                st.rerun()
+    return True
+
+
+def student_progress(name):
+    """The student's score and solved tasks, read from the shared store once per session."""
+    cached = st.session_state.get("progress")
+    if cached is None or cached[0] != name:
+        cached = st.session_state.progress = (name, get_progress_store().progress(name))
+    return cached[1]
+
+
+def record_completion(name, task):
+    """Credit a solved task to the student once; returns True if it earned a point."""
+    progress = student_progress(name)
+    if (task.category, task.index) in progress.completed:
+        return False
+    new, progress.score = get_progress_store().complete(name, task.category, task.index)
+    progress.completed.add((task.category, task.index))
+    return new
+
+
+def show_leaderboard(name=None):
+    """Top students by score, plus the student's own rank when they are not on it."""
+    with st.expander("🏆 Leaderboard", expanded=name is None):
+        st.fragment(_leaderboard_panel, run_every=config.LEADERBOARD_REFRESH or None)(name)
+
+
+def _leaderboard_panel(name):
+    board = get_leaderboard()
+    try:
+        board.refresh()
+    except Exception as e:
+        st.error(f"⚠️ Error reading scores: {e}")
+        return
+    top = board.top()
+    if not top:
+        st.info("No solved tasks yet.")
+        return
+    st.dataframe(pd.DataFrame(top), use_container_width=True, hide_index=True)
+    own = board.standing(name) if name else None
+    if own and all(standing.name != name for standing in top):
+        st.caption(f"You are #{own.rank} of {board.students} with {own.score} points.")
+
+
+def show_submissions():
+    """Teacher view of the submission log, optionally only since a given day."""
+    col1, col2 = st.columns(2)
+    refresh_every = col1.number_input("Auto-refresh every (seconds, 0 = off)", min_value=0, value=0, step=5)
+    since = col2.date_input("Show submissions since", value=None)
+    st.fragment(_submissions_panel, run_every=refresh_every or None)(since)
+
+
+def _submissions_panel(since):
+    try:
+        # A window reads only its own partitions; the whole log is kept up to date in memory
+        if since:
+            df = get_store().read_frame(since=since.isoformat())
+            total, rows = len(df), lambda start, stop: df.iloc[start:stop]
+        else:
+            tail = get_tail()
+            total, rows = tail.refresh(), tail.rows
+    except Exception as e:
+        st.error(f"⚠️ Error reading submissions: {e}")
+        return
+
+    if not total:
+        st.info("No submissions yet.")
+        return
+
+    # Only one page goes to the browser; page 1 holds the newest submissions
+    size = config.SUBMISSIONS_PAGE_SIZE
+    pages = -(-total // size)
+    page = st.number_input("Page (1 = newest)", min_value=1, max_value=pages, value=1,
+                           key="submissions_page") if pages > 1 else 1
+    stop = total - (page - 1) * size
+    start = max(stop - size, 0)
+    st.dataframe(rows(start, stop), use_container_width=True)
+    st.caption(f"Submissions {start + 1:,}–{stop:,} of {total:,}")
+
+
+def show_export():
+    """Teacher download of the submission log, filtered and generated only on click."""
+    with st.expander("⬇️ Export submissions"):
+        store = get_store()
+        try:
+            names = store.student_summary()["name"].tolist()
+            categories = store.task_summary()["category"].unique().tolist()
+        except Exception as e:
+            st.error(f"⚠️ Error reading submissions: {e}")
+            return
+        col1, col2, col3 = st.columns(3)
+        fmt = col1.selectbox("Format", list(FORMATS))
+        since = col2.date_input("From", value=None)
+        until = col3.date_input("Until", value=None)
+        filters = ExportFilter(
+            since=since and since.isoformat(),
+            until=until and until.isoformat(),
+            names=tuple(st.multiselect("Students", names, placeholder="All students")),
+            categories=tuple(st.multiselect("Categories", categories, placeholder="All categories")),
+        )
+        extension, mime = FORMATS[fmt]
+        max_bytes = config.EXPORT_MAX_MB * 1024 * 1024
+        st.download_button(f"⬇️ Download submissions ({fmt})",
+                           lambda: export_file(fmt, filters, max_bytes=max_bytes),
+                           file_name=f"submissions.{extension}", mime=mime, on_click="ignore")
+        st.caption(f"Downloads are limited to {config.EXPORT_MAX_MB} MB. For more, run "
+                   f"`python -m core.export submissions.{extension}` on the server.")
+
+
+def show_analytics():
+    """Teacher view of per-student and per-task progress, read from the summary tables."""
+    with st.expander("📈 Class analytics"):
+        store = get_store()
+        try:
+            students = store.student_summary()
+            tasks = store.task_summary()
+        except Exception as e:
+            st.error(f"⚠️ Error reading submissions: {e}")
+            return
+        if students.empty:
+            st.info("No submissions yet.")
+            return
+        percent = {column: st.column_config.ProgressColumn(column, format="percent", min_value=0, max_value=1)
+                   for column in ("accuracy", "success_rate", "solve_rate")}
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Students", f"{len(students):,}")
+        col2.metric("Submissions", f"{int(students['attempts'].sum()):,}")
+        col3.metric("Accuracy", f"{students['correct'].sum() / students['attempts'].sum():.0%}")
+        st.markdown("**Hardest tasks**")
+        st.dataframe(hardest_tasks(tasks), use_container_width=True, hide_index=True, column_config=percent)
+        st.markdown("**Tasks**")
+        st.dataframe(tasks, use_container_width=True, hide_index=True, column_config=percent)
+        st.markdown("**Students**")
+        st.dataframe(students, use_container_width=True, hide_index=True, column_config=percent)
+
+
+def show_regrade():
+    """Teacher action: re-grade every stored submission against the current tasks."""
+    with st.expander("♻️ Re-grade submissions"):
+        st.caption("Re-runs the submission history against the current tasks and fixes stale verdicts.")
+        if not st.button("♻️ Re-grade all submissions"):
+            return
+        from core.regrade import regrade  # process pool machinery, teacher-only
+
+        bar = st.progress(0.0, text="Re-grading…")
+        try:
+            report = regrade(progress=lambda done, total: bar.progress(done / total, text=f"Batch {done}/{total}"))
+        except Exception as e:
+            st.error(f"⚠️ Error: {e}")
+            return
+        st.success(f"Re-graded {report.submissions:,} submissions ({report.unique_queries:,} distinct queries) "
+                   f"in {report.elapsed:.1f}s – {len(report.changes):,} verdicts changed.")
+        if report.credited or report.revoked:
+            st.info(f"🏅 Scores updated: {report.credited:,} tasks credited, {report.revoked:,} taken back.")
+        if report.changes:
+            st.dataframe(pd.DataFrame(report.changes,
+                                      columns=["id", "name", "category", "task_index", "was_correct", "now_correct"]),
+                         use_container_width=True, hide_index=True)
+
+
+def show_sandbox_controls(sandbox):
+    """Sidebar state of the session's sandbox with a reset button."""
+    if sandbox.modified:
+        st.sidebar.caption("✏️ Your database has changes from your own statements.")
+    if st.sidebar.button("🔄 Reset database", disabled=not sandbox.modified):
+        sandbox.reset()
+        clear_result()
+        st.rerun()
+
+
+def show_er_diagram(dataset_name):
+    """ER diagram of a dataset, rendered once per dataset version."""
+    kind, diagram = er_diagram(dataset_name)
+    if kind == "svg":
+        st.image(diagram, use_container_width=True)
+    else:
+        st.graphviz_chart(diagram, use_container_width=True)
+
+
+def show_chart(df):
+    """Chart the numeric columns of a result, reduced to a bounded number of points."""
+    data = chart_data(df)
+    if data is None:
+        return
+    st.subheader("📊 Visualization")
+    if data.kind == "line":
+        st.line_chart(data.frame)
+    else:
+        st.bar_chart(data.frame)
+    if data.note:
+        st.caption(data.note)
+
+
+def show_clusters():
+    """Teacher view: each task's submissions grouped into distinct answers."""
+    with st.expander("🧩 Answer clusters"):
+        try:
+            tail = get_tail()
+            tail.refresh()
+            df = tail.frame()
+        except Exception as e:
+            st.error(f"⚠️ Error reading submissions: {e}")
+            return
+        if df.empty:
+            st.info("No submissions yet.")
+            return
+        clusters = answer_clusters(df)
+        tasks = clusters[["category", "task_index"]].drop_duplicates().itertuples(index=False)
+        task = st.selectbox("Task", list(tasks), format_func=lambda t: f"{t.category} – task {t.task_index + 1}")
+        shown = clusters[(clusters["category"] == task.category) & (clusters["task_index"] == task.task_index)]
+        st.caption(f"{int(shown['submissions'].sum()):,} submissions, {len(shown):,} distinct answers")
+        st.dataframe(shown[["submissions", "students", "correct", "example"]], use_container_width=True,
+                     hide_index=True, column_config={"correct": st.column_config.ProgressColumn(
+                         "correct", format="percent", min_value=0, max_value=1)})
+
+
+def show_performance(stats):
+    """Execution cost of the last query: wall time, rows, VM steps and plan."""
+    with st.expander("⚡ Performance", expanded=True):
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Wall time", f"{stats.elapsed_ms:.1f} ms")
+        col2.metric("Rows returned", f"{stats.rows:,}")
+        col3.metric("VM steps", f"≈{stats.vm_steps:,}")
+        if stats.cached:
+            st.caption("♻️ Served from the shared result cache; the numbers are from its first run.")
+        if stats.plan:
+            st.code(stats.plan, language=None)
+            for table in stats.full_scans:
+                st.caption(f"🐢 Full scan of `{table}` – an index or a tighter WHERE could avoid it.")
+
+
+def show_server_status():
+    """Load indicators for the teacher: session sandboxes and query pool usage."""
+    with st.expander("🖥️ Server status"):
+        sandboxes = get_sandboxes().metrics()
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Session sandboxes", f"{sandboxes['sandboxes']} ({sandboxes['modified']} modified)")
+        col2.metric("Sandbox memory", f"{sandboxes['bytes'] / (1024 * 1024):.1f} MB")
+        col3.metric("Sandboxes evicted", sandboxes["evicted"])
+        if config.RESULT_CACHE_MB:
+            cache = get_result_cache().metrics()
+            lookups = cache["hits"] + cache["misses"]
+            col1, col2, col3 = st.columns(3)
+            col1.metric("Result cache hit rate", f"{cache['hits'] / lookups:.0%}" if lookups else "–")
+            col2.metric("Cached results", f"{cache['entries']:,}")
+            col3.metric("Result cache memory", f"{cache['bytes'] / (1024 * 1024):.1f} MB")
+        known = verdicts.metrics()
+        lookups = known["hits"] + known["misses"]
+        col1, col2, _ = st.columns(3)
+        col1.metric("Graded by fingerprint", f"{known['hits'] / lookups:.0%}" if lookups else "–")
+        col2.metric("Known answers", f"{known['entries']:,}")
+        if not config.QUERY_WORKERS:
+            return
+        metrics = get_pool().metrics()
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric("Busy workers", f"{metrics['busy']} / {metrics['workers']}")
+        col2.metric("Queued queries", metrics["queue_depth"])
+        col3.metric("Queries run", f"{metrics['completed']:,}")
+        col4.metric("Workers restarted", metrics["killed"])
@@ -0,0 +1,175 @@
+"""Hidden variants of the lesson datasets, used for robust grading.
+
+A variant holds the same rows as its dataset with every ``id`` primary key
+replaced by a random, unique id (foreign keys follow) and every other
+integer column scaled by a small random factor. A query that hard-codes an
+id or a value it read off the fixture passes on the dataset but not on its
+variants. Variants are named ``<dataset>~<seed>`` and are resolved by
+``get_dataset`` like any other dataset, so sandboxes, caches and query
+workers handle them unchanged.
+
+Like the scaled datasets, each variant is built once into a SQLite file
+under ``DATASET_DIR``: all new keys and values are drawn first, then every
+table is rewritten in a single INSERT ... SELECT through lookup tables.
+"""
+import functools
+import hashlib
+import json
+import os
+import sqlite3
+
+import numpy as np
+
+from core import config
+
+SEPARATOR = "~"
+# Bump when the perturbation changes, so cached expected results are recomputed
+VARIANT_VERSION = 1
+# New ids are drawn from 1..KEY_SPREAD * rows
+KEY_SPREAD = 3
+# Values are scaled by a factor within 1 ± VALUE_JITTER, keeping three significant digits
+VALUE_JITTER = 0.15
+# Draws tried to avoid new ties before the last one is kept
+PERTURB_ATTEMPTS = 5
+
+
+def variant_names(dataset_name, count=None):
+    """Names of the hidden variants a submission on ``dataset_name`` is graded against."""
+    count = config.GRADING_VARIANTS if count is None else count
+    return [f"{dataset_name}{SEPARATOR}{seed}" for seed in range(1, count + 1)]
+
+
+def _round_like(values, originals):
+    """Integers rounded to three significant digits of the matching ``originals``."""
+    magnitude = np.floor(np.log10(np.maximum(np.abs(originals), 1)))
+    step = 10 ** np.maximum(magnitude - 2, 0)
+    return (np.round(values / step) * step).astype("int64")
+
+
+class VariantDataset:
+    def __init__(self, base, seed):
+        self.base = base
+        self.seed = seed
+        self.name = f"{base.name}{SEPARATOR}{seed}"
+        self.schema = base.schema
+
+    @property
+    def version(self):
+        key = f"{self.base.version}:{self.seed}:{VARIANT_VERSION}"
+        return hashlib.sha256(key.encode("utf-8")).hexdigest()[:12]
+
+    @property
+    def path(self):
+        return os.path.join(config.DATASET_DIR, f"{self.name}-{self.version}.sqlite")
+
+    def ensure_file(self):
+        if not os.path.isfile(self.path):
+            from core.datagen import build_file
+            build_file(self.path, self._build)
+        return self.path
+
+    def load(self, conn):
+        source = sqlite3.connect(self.ensure_file())
+        try:
+            source.backup(conn)
+        finally:
+            source.close()
+
+    def _build(self, conn):
+        self.base.load(conn)
+        conn.execute("PRAGMA temp_store = MEMORY")
+        rng = np.random.default_rng(self.seed)
+        tables = [name for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table' "
+                                                   "AND name NOT LIKE 'sqlite_%' ORDER BY name")]
+        indexes = conn.execute("SELECT name, sql FROM sqlite_master WHERE type = 'index' "
+                               "AND sql IS NOT NULL").fetchall()
+        with conn:
+            # Draw every mapping first, then rewrite each table once
+            mapped = self._permute_keys(conn, rng, tables)
+            for table in tables:
+                references = {row[3] for row in conn.execute(f"PRAGMA foreign_key_list({table})")}
+                for _, column, column_type, _, _, primary_key in conn.execute(f"PRAGMA table_info({table})"):
+                    if column_type.upper() == "INTEGER" and not primary_key and column not in references:
+                        if self._perturb(conn, rng, table, column):
+                            mapped[table][column] = f"value_{table}_{column}"
+            # Rebuilding the indexes afterwards is cheaper than updating them row by row
+            for name, _ in indexes:
+                conn.execute(f'DROP INDEX "{name}"')
+            for table in tables:
+                if mapped[table]:
+                    self._rewrite(conn, table, mapped[table])
+            for _, sql in indexes:
+                conn.execute(sql)
+            for (name,) in conn.execute("SELECT name FROM temp.sqlite_master WHERE type = 'table'").fetchall():
+                conn.execute(f"DROP TABLE temp.{name}")
+        conn.execute("ANALYZE")
+
+    @staticmethod
+    def _store_map(conn, name, old, new):
+        """Temporary table ``name`` mapping each of ``old`` to the matching ``new``."""
+        conn.execute(f"CREATE TEMP TABLE {name} (old INTEGER PRIMARY KEY, new INTEGER)")
+        # One statement per map: the pairs travel as a single JSON array
+        conn.execute(f"INSERT INTO temp.{name} SELECT value ->> 0, value ->> 1 FROM json_each(?)",
+                     (json.dumps(list(zip(old, new))),))
+
+    @staticmethod
+    def _rewrite(conn, table, mapped):
+        """Reinsert ``table`` with each column in ``mapped`` looked up in its map (unmapped values kept).
+
+        Rows go back in order of their new ``id``, which appends to the table
+        instead of moving every row within it as an UPDATE of the key would.
+        """
+        columns = [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+        values = [f"coalesce((SELECT new FROM temp.{mapped[column]} WHERE old = r.{column}), r.{column})"
+                  if column in mapped else f"r.{column}" for column in columns]
+        order = " ORDER BY 1" if "id" in mapped else ""
+        conn.execute(f"CREATE TEMP TABLE variant_rows AS SELECT * FROM {table}")
+        conn.execute(f"DELETE FROM {table}")
+        conn.execute(f"INSERT INTO {table} ({', '.join(columns)}) SELECT {', '.join(values)} "
+                     f"FROM temp.variant_rows r{order}")
+        conn.execute("DROP TABLE temp.variant_rows")
+
+    @classmethod
+    def _permute_keys(cls, conn, rng, tables):
+        """Draw a new random ``id`` for every row; returns the key columns to map, by table."""
+        keyed = []
+        for table in tables:
+            columns = {row[1]: row[5] for row in conn.execute(f"PRAGMA table_info({table})")}
+            if not columns.get("id"):
+                continue
+            ids = [row_id for (row_id,) in conn.execute(f"SELECT id FROM {table} ORDER BY id")]
+            # A random permutation of the blocks, then a random id within each block
+            new_ids = rng.permutation(len(ids)) * KEY_SPREAD + rng.integers(1, KEY_SPREAD + 1, len(ids))
+            cls._store_map(conn, f"key_{table}", ids, new_ids.tolist())
+            keyed.append(table)
+        mapped = {table: {"id": f"key_{table}"} if table in keyed else {} for table in tables}
+        for table in tables:
+            for row in conn.execute(f"PRAGMA foreign_key_list({table})").fetchall():
+                target, column, target_column = row[2], row[3], row[4]
+                if target in keyed and target_column in (None, "id"):
+                    mapped[table][column] = f"key_{target}"
+        return mapped
+
+    @classmethod
+    def _perturb(cls, conn, rng, table, column):
+        """Draw new values for an integer column; returns whether there were any."""
+        values = [value for (value,) in conn.execute(f"SELECT DISTINCT {column} FROM {table} "
+                                                     f"WHERE typeof({column}) = 'integer' ORDER BY {column}")]
+        if not values:
+            return False
+        # Equal values stay equal; distinct ones should stay distinct, so ORDER BY ... LIMIT has no new ties
+        distinct = np.array(values)
+        for _ in range(PERTURB_ATTEMPTS):
+            perturbed = _round_like(distinct * rng.uniform(1 - VALUE_JITTER, 1 + VALUE_JITTER, len(distinct)),
+                                    distinct)
+            if len(np.unique(perturbed)) == len(distinct):
+                break
+        cls._store_map(conn, f"value_{table}_{column}", values, perturbed.tolist())
+        return True
+
+
+@functools.lru_cache(maxsize=None)
+def variant_dataset(base_name, seed):
+    from core.datasets import get_dataset
+
+    return VariantDataset(get_dataset(base_name), seed)
@@ -1,7 +1,17 @@
 import streamlit as st
 
+from core.catalog import LESSONS, CatalogError, get_catalog
+
 st.set_page_config(page_title="SQL Training App", layout="wide")
 
+# --- Validate every lesson's expected answers before students arrive ---
+try:
+    for lesson in LESSONS:
+        get_catalog(lesson)
+except CatalogError as e:
+    st.error(f"⚠️ {e}")
+    st.stop()
+
 st.title("🎓 SQL Learning Platform")
 st.markdown("""
 Welcome to the **Interactive SQL Training App**!
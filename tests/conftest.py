@@ -0,0 +1,9 @@
+import os
+import tempfile
+
+# Keep the stores the app opens by default out of the working directory
+_scratch = tempfile.mkdtemp(prefix="sql-trainer-tests-")
+os.environ.setdefault("SQL_TRAINER_SUBMISSIONS_DB", os.path.join(_scratch, "submissions.db"))
+os.environ.setdefault("SQL_TRAINER_PROGRESS_DB", os.path.join(_scratch, "progress.db"))
+# Grade against hidden variants as a deployment with query workers does
+os.environ.setdefault("SQL_TRAINER_GRADING_VARIANTS", "3")
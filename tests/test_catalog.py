@@ -0,0 +1,21 @@
+from core import catalog
+from core.catalog import load_catalog, validate_catalog
+from core.grading import ExpectedResultCache
+
+
+def test_cached_answers_are_validated_without_running(tmp_path, monkeypatch):
+    runs = []
+    run_query = catalog.run_query
+    monkeypatch.setattr(catalog, "run_query", lambda *args: runs.append(args) or run_query(*args))
+    basics = load_catalog("basics")
+    monkeypatch.setattr(catalog, "expected_results", ExpectedResultCache(str(tmp_path)))
+    assert validate_catalog(basics)
+    ran = len(runs)
+    assert ran
+
+    # A restart with the same dataset version reads the answers from disk
+    monkeypatch.setattr(catalog, "expected_results", ExpectedResultCache(str(tmp_path)))
+    assert validate_catalog(basics) == {}
+    assert len(runs) == ran
+    assert len(validate_catalog(basics, retime=True)) == len(list(basics))
+    assert len(runs) == 2 * ran
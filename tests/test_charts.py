@@ -0,0 +1,52 @@
+import pandas as pd
+
+from core.charts import chart_data
+
+
+def employees(count):
+    return pd.DataFrame({
+        "id": range(count),
+        "department_id": [i % 3 for i in range(count)],
+        "name": [f"e{i}" for i in range(count)],
+        "salary": [1000.0 * i for i in range(count)],
+    })
+
+
+def test_key_columns_are_not_charted():
+    data = chart_data(employees(4))
+    assert data.kind == "bar"
+    assert list(data.frame.columns) == ["salary"]
+    assert list(data.frame.index) == ["e0", "e1", "e2", "e3"]
+
+
+def test_nothing_to_chart():
+    assert chart_data(employees(4)[["id", "department_id", "name"]]) is None
+    assert chart_data(employees(0)) is None
+
+
+def test_repeated_labels_are_averaged():
+    df = pd.DataFrame({"city": ["a", "b", "a", "b", "c"], "sales": [1, 10, 3, 20, 5]})
+    # Small results are drawn as is; labels that repeat cannot be the axis
+    data = chart_data(df, max_points=5)
+    assert data.frame["sales"].to_dict() == {0: 1, 1: 10, 2: 3, 3: 20, 4: 5}
+
+    data = chart_data(df, max_points=4)
+    assert data.kind == "bar"
+    assert data.frame["sales"].to_dict() == {"a": 2, "b": 15, "c": 5}
+    assert data.note == "Average per city over 5 rows."
+
+
+def test_only_the_largest_labels_are_kept():
+    df = pd.DataFrame({"city": [f"c{i % 20}" for i in range(100)], "sales": [i % 20 for i in range(100)]})
+    data = chart_data(df, max_points=5)
+    assert list(data.frame.index) == ["c19", "c18", "c17", "c16", "c15"]
+    assert data.note == "Average per city: top 5 of 20 by sales, over 100 rows."
+
+
+def test_unlabelled_rows_are_binned():
+    data = chart_data(employees(1000).drop(columns="name"), max_points=100)
+    assert data.kind == "line"
+    assert len(data.frame) == 100
+    assert list(data.frame.index[:3]) == [0, 10, 20]
+    assert data.frame["salary"].iloc[0] == 4500.0
+    assert data.note == "Average of every 10 rows (1,000 rows in total)."
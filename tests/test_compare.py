@@ -0,0 +1,96 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from core.compare import ComparisonRules, results_match, rules_for
+
+ORDERED = ComparisonRules(ignore_row_order=False)
+
+
+def column(*values):
+    return pd.DataFrame({"x": list(values)})
+
+
+def test_row_and_column_order_are_ignored_by_default():
+    actual = pd.DataFrame({"a": [1, 2], "b": ["x", "y"]})
+    expected = pd.DataFrame({"b": ["y", "x"], "a": [2, 1]})
+    assert results_match(actual, expected)
+    assert not results_match(actual, expected, ORDERED)
+
+
+def test_row_order_matters_when_the_answer_sorts():
+    assert not rules_for("SELECT * FROM t ORDER BY a").ignore_row_order
+    assert rules_for("SELECT * FROM t").ignore_row_order
+
+
+def test_duplicate_rows_are_counted():
+    assert not results_match(column(1, 1, 2), column(1, 2, 2))
+
+
+def test_column_names_ignore_case_and_whitespace():
+    assert results_match(pd.DataFrame({"COUNT(*)": [3]}), pd.DataFrame({"count( * )": [3]}))
+
+
+def test_types_are_coerced():
+    assert results_match(column(5), column(5.0))
+    assert results_match(column("5"), column(5))
+    assert not results_match(column("5"), column(5), ComparisonRules(coerce_types=False))
+
+
+def test_nulls_match_nulls_only():
+    assert results_match(column(None, "a"), column("a", None))
+    assert results_match(column(np.nan, 1.0), column(1.0, np.nan))
+    assert not results_match(column(None, "a"), column("None", "a"))
+
+
+@pytest.mark.parametrize("actual, expected", [
+    (0.1 + 0.2, 0.3),
+    (1 / 3, 0.333333333),
+    (-0.0, 0.0),
+    (-1e-9, 0.0),
+    (1e15 + 0.1, 1e15 + 0.1),
+    (float("inf"), float("inf")),
+])
+def test_floats_within_tolerance_match(actual, expected):
+    assert results_match(column(actual), column(expected))
+
+
+@pytest.mark.parametrize("actual, expected", [
+    (1.0, 1.00001),
+    (0.0, 2e-6),
+    (float("inf"), float("-inf")),
+])
+def test_floats_beyond_tolerance_differ(actual, expected):
+    assert not results_match(column(actual), column(expected))
+
+
+def test_no_tolerance_compares_exactly():
+    assert not results_match(column(0.1 + 0.2), column(0.3), ComparisonRules(float_tolerance=0))
+
+
+def duplicate_names(*columns):
+    frame = pd.DataFrame(dict(enumerate(values for _, values in columns)))
+    frame.columns = [name for name, _ in columns]
+    return frame
+
+
+def test_duplicate_column_names_in_another_order():
+    actual = duplicate_names(("name", ["Anna", "Peter"]), ("name", ["HR", "IT"]), ("salary", [400, 650]))
+    expected = duplicate_names(("name", ["HR", "IT"]), ("name", ["Anna", "Peter"]), ("salary", [400, 650]))
+    assert results_match(actual, expected)
+    assert results_match(actual, expected, ORDERED)
+    assert not results_match(actual, expected, ComparisonRules(ignore_column_order=False))
+
+
+def test_duplicate_column_names_of_different_types():
+    actual = duplicate_names(("id", [1, 2]), ("id", ["a", "b"]))
+    expected = duplicate_names(("id", ["a", "b"]), ("id", [1, 2]))
+    assert results_match(actual, expected)
+    assert results_match(actual, expected, ComparisonRules(coerce_types=False))
+
+
+def test_duplicate_column_names_with_different_values():
+    actual = duplicate_names(("name", ["Anna", "Peter"]), ("name", ["HR", "IT"]))
+    expected = duplicate_names(("name", ["Anna", "Peter"]), ("name", ["IT", "HR"]))
+    assert not results_match(actual, expected, ORDERED)
+    assert not results_match(actual, expected)
@@ -0,0 +1,73 @@
+import sqlite3
+
+import pytest
+
+from core import config
+from core.catalog import load_catalog, task_time_limit
+from core.datagen import build_database
+from core.datasets import DATASETS
+from core.execution import EXPECTED_BUDGET, QueryStats, run_query
+
+ROWS = 10_000
+
+
+@pytest.fixture(scope="module")
+def scaled(tmp_path_factory):
+    """Both lesson datasets scaled to ROWS rows."""
+    conns = {}
+    for name, base in DATASETS.items():
+        path = str(tmp_path_factory.mktemp("datasets") / f"{name}.sqlite")
+        build_database(base, ROWS, 0, path)
+        conns[name] = sqlite3.connect(path)
+    yield conns
+    for conn in conns.values():
+        conn.close()
+
+
+def test_fixture_rows_keep_their_ids(scaled):
+    conn = scaled["basics"]
+    assert conn.execute("SELECT name FROM departments WHERE id = 2").fetchone() == ("IT",)
+    assert conn.execute("SELECT COUNT(*) FROM employees").fetchone()[0] == ROWS // 4
+
+
+def test_foreign_keys_and_names_are_indexed(scaled):
+    for conn in scaled.values():
+        assert conn.execute("PRAGMA foreign_key_check").fetchall() == []
+        indexed = {(table, column)
+                   for (table,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'").fetchall()
+                   for index in conn.execute(f"PRAGMA index_list({table})").fetchall()
+                   for _, _, column in conn.execute(f"PRAGMA index_info({index[1]})").fetchall()}
+        for (table,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table' "
+                                     "AND name NOT LIKE 'sqlite_%'").fetchall():
+            for row in conn.execute(f"PRAGMA foreign_key_list({table})").fetchall():
+                assert (table, row[3]) in indexed
+            if any(column[1] == "name" for column in conn.execute(f"PRAGMA table_info({table})")):
+                assert (table, "name") in indexed
+
+
+def test_same_seed_same_data(tmp_path, scaled):
+    path = str(tmp_path / "again.sqlite")
+    build_database(DATASETS["complex"], ROWS, 0, path)
+    again = sqlite3.connect(path)
+    try:
+        query = "SELECT SUM(hours), SUM(assigned_to * project_id) FROM tasks"
+        assert again.execute(query).fetchone() == scaled["complex"].execute(query).fetchone()
+    finally:
+        again.close()
+
+
+def test_time_limit_grows_with_the_dataset(monkeypatch):
+    monkeypatch.setattr(config, "TASK_MAX_MS", 500)
+    monkeypatch.setattr(config, "TASK_MAX_MS_ROWS", 10_000)
+    assert task_time_limit(0) == task_time_limit(10_000) == 500
+    assert task_time_limit(100_000) == 5000
+
+
+@pytest.mark.parametrize("lesson", ["basics", "complex"])
+def test_expected_queries_fit_their_budget_at_scale(scaled, lesson):
+    catalog = load_catalog(lesson)
+    conn = scaled[catalog.dataset]
+    for task in catalog:
+        stats = QueryStats()
+        run_query(conn, task.expected, EXPECTED_BUDGET, stats)
+        assert stats.elapsed_ms < task_time_limit(ROWS), f"{task.category} #{task.index + 1}"
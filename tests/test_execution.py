@@ -0,0 +1,57 @@
+import pytest
+
+from core.execution import QueryBudget, QueryBudgetExceeded, QueryStats, count_rows, fetch_page, run_query
+from core.sandbox import open_sandbox
+
+ENDLESS = "WITH RECURSIVE r(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM r) SELECT COUNT(*) FROM r"
+NUMBERS = "WITH RECURSIVE r(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM r WHERE x < 120) SELECT x FROM r"
+
+
+@pytest.fixture
+def conn():
+    conn = open_sandbox("basics")
+    yield conn
+    conn.close()
+
+
+def test_run_query_collects_stats(conn):
+    stats = QueryStats()
+    frame = run_query(conn, NUMBERS, stats=stats)
+    assert frame["x"].tolist()[:3] == [1, 2, 3]
+    assert stats.rows == 120
+    assert stats.vm_steps > 0
+
+
+def test_time_limit(conn):
+    with pytest.raises(QueryBudgetExceeded, match="seconds"):
+        run_query(conn, ENDLESS, QueryBudget(time_limit=0.2, max_vm_steps=10**12))
+
+
+def test_vm_step_limit(conn):
+    with pytest.raises(QueryBudgetExceeded, match="VM steps"):
+        run_query(conn, ENDLESS, QueryBudget(max_vm_steps=10_000))
+
+
+def test_row_limit(conn):
+    with pytest.raises(QueryBudgetExceeded, match="rows returned"):
+        run_query(conn, NUMBERS, QueryBudget(max_rows=100))
+
+
+def test_connection_is_usable_after_an_abort(conn):
+    with pytest.raises(QueryBudgetExceeded):
+        run_query(conn, ENDLESS, QueryBudget(max_vm_steps=10_000))
+    assert len(run_query(conn, "SELECT * FROM departments")) == 3
+
+
+def test_pages_and_count(conn):
+    page, has_more = fetch_page(conn, NUMBERS, page=2, page_size=50)
+    assert page["x"].tolist() == list(range(101, 121))
+    assert not has_more
+    assert fetch_page(conn, NUMBERS, page=0, page_size=50)[1]
+    assert count_rows(conn, NUMBERS) == 120
+
+
+def test_budget_grows_with_the_expected_rows():
+    budget = QueryBudget(time_limit=1, max_vm_steps=1000, max_rows=100, max_bytes=1000)
+    assert budget.for_rows(50) is budget
+    assert budget.for_rows(300) == QueryBudget(3, 3000, 300, 3000)
@@ -0,0 +1,127 @@
+import sqlite3
+
+import pytest
+
+from core import config, executor, grading
+from core.execution import QueryBudget, QueryBudgetExceeded, QueryStats
+from core.executor import QueryPool, count_rows, explain_plan, fetch_page
+from core.grading import passes_variants
+from core.resultcache import ResultCache
+from core.sandbox import open_sandbox
+from core.variants import variant_names
+
+ENDLESS = "WITH RECURSIVE r(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM r) SELECT COUNT(*) FROM r"
+
+
+@pytest.fixture(scope="module")
+def pool():
+    pool = QueryPool(1, ["basics"])
+    yield pool
+    pool.shutdown()
+
+
+@pytest.fixture
+def workers(monkeypatch, pool):
+    """Route the executor's functions through ``pool``."""
+    monkeypatch.setattr(config, "QUERY_WORKERS", 1)
+    monkeypatch.setattr(executor, "get_pool", lambda: pool)
+    return pool
+
+
+def test_query(pool):
+    frame = pool.run("basics", "SELECT name FROM departments ORDER BY id")
+    assert frame["name"].tolist() == ["HR", "IT", "Marketing"]
+
+
+def test_errors_come_back(pool):
+    with pytest.raises(Exception, match="no such table"):
+        pool.run("basics", "SELECT * FROM nowhere")
+
+
+def test_hung_worker_is_replaced(pool):
+    budget = QueryBudget(time_limit=0.2, max_vm_steps=10**12)
+    with pytest.raises(QueryBudgetExceeded):
+        pool.run("basics", ENDLESS, budget)
+    assert len(pool.run("basics", "SELECT * FROM employees")) == 5
+
+
+def test_viewer_operations_run_in_the_pool(workers):
+    completed = workers.metrics()["completed"]
+    page, has_more = fetch_page("basics", "SELECT * FROM employees ORDER BY id", 0)
+    assert page["name"].iloc[0] == "Anna Kovacs" and not has_more
+    assert count_rows("basics", "SELECT * FROM sales") == 3
+    assert "SCAN" in explain_plan("basics", "SELECT * FROM sales")
+    assert workers.metrics()["completed"] == completed + 3
+
+
+def test_modified_sandboxes_run_inline(workers):
+    conn = open_sandbox("basics")
+    try:
+        conn.execute("DELETE FROM sales")
+        completed = workers.metrics()["completed"]
+        assert count_rows("basics", "SELECT * FROM sales", conn, pristine=False) == 0
+        assert workers.metrics()["completed"] == completed
+    finally:
+        conn.close()
+
+
+@pytest.fixture
+def secret(tmp_path):
+    path = str(tmp_path / "secret.db")
+    conn = sqlite3.connect(path)
+    with conn:
+        conn.execute("CREATE TABLE t (x)")
+        conn.execute("INSERT INTO t VALUES ('hidden')")
+    conn.close()
+    return path
+
+
+@pytest.mark.parametrize("inline", [False, True])
+def test_shared_connections_only_read(request, secret, inline):
+    if not inline:
+        request.getfixturevalue("workers")
+    for sql in [f"ATTACH '{secret}' AS s", "PRAGMA query_only = OFF", "PRAGMA case_sensitive_like = 1",
+                "CREATE TEMP TABLE t AS SELECT * FROM employees", "DELETE FROM employees", "BEGIN"]:
+        with pytest.raises(Exception, match="not authorized"):
+            fetch_page("basics", sql, 0)
+    with pytest.raises(Exception, match="no such table"):
+        fetch_page("basics", "SELECT * FROM s.t", 0)
+    assert count_rows("basics", "SELECT * FROM employees WHERE name LIKE 'anna%'") == 1
+    assert len(fetch_page("basics", "PRAGMA table_info(employees)", 0)[0]) == 5
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    cache = ResultCache(64 * 1024 * 1024)
+    monkeypatch.setattr(executor, "get_result_cache", lambda: cache)
+    return cache
+
+
+def test_cache_hit_takes_the_callers_column_names(cache):
+    first = executor.execute("basics", "SELECT name AS Name, salary FROM employees ORDER BY id")
+    stats = QueryStats()
+    second = executor.execute("basics", "select name as NAME, SALARY from employees order by id", stats=stats)
+    assert stats.cached and cache.hits == 1
+    assert list(first.columns) == ["Name", "salary"]
+    # SQLite names a bare column after its declaration, an alias as written
+    assert list(second.columns) == ["NAME", "salary"]
+    assert second["NAME"].tolist() == first["Name"].tolist()
+
+
+HARD_CODED = "SELECT name FROM employees WHERE department_id = 2"
+BY_NAME = "SELECT e.name FROM employees e JOIN departments d ON d.id = e.department_id WHERE d.name = 'IT'"
+
+
+def test_variants_run_inline():
+    assert passes_variants("basics", BY_NAME, BY_NAME)
+    assert not passes_variants("basics", BY_NAME, HARD_CODED)
+    assert not passes_variants("basics", BY_NAME, "SELECT * FROM nowhere")
+
+
+def test_variants_run_in_the_pool(monkeypatch, workers):
+    monkeypatch.setattr(grading, "get_pool", lambda: workers)
+    completed = workers.metrics()["completed"]
+    assert passes_variants("basics", BY_NAME, BY_NAME)
+    assert workers.metrics()["completed"] - completed == len(variant_names("basics"))
+    assert not passes_variants("basics", BY_NAME, HARD_CODED)
+    assert not passes_variants("basics", BY_NAME, "SELECT * FROM nowhere")
@@ -0,0 +1,48 @@
+import csv
+import io
+
+import pyarrow.parquet
+import pytest
+from streamlit.runtime.download_data_util import convert_data_to_bytes_and_infer_mime
+
+from core.export import ExportFilter, ExportTooLarge, export, export_file
+from core.submissions import COLUMNS, SubmissionStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = SubmissionStore(str(tmp_path / "submissions.db"))
+    for i in range(50):
+        store.record(f"student{i % 5}", "WHERE filters", i % 3, f"SELECT {i}", i % 2 == 0, 1)
+    store.flush()
+    yield store
+    store.close()
+
+
+def test_csv_export_is_filtered(store):
+    out = io.BytesIO()
+    count = export(out, "csv", ExportFilter(names=("student1",)), store, chunk_rows=3)
+    rows = list(csv.reader(io.StringIO(out.getvalue().decode("utf-8"))))
+    assert count == 10 and len(rows) == 11
+    assert rows[0] == COLUMNS
+    assert {row[COLUMNS.index("name")] for row in rows[1:]} == {"student1"}
+
+
+def test_parquet_export(store):
+    with export_file("parquet", store=store) as out:
+        assert pyarrow.parquet.read_table(out).num_rows == 50
+
+
+@pytest.mark.parametrize("fmt", ["csv", "parquet", "arrow"])
+def test_downloads_are_capped(store, fmt):
+    with pytest.raises(ExportTooLarge):
+        export_file(fmt, store=store, max_bytes=100)
+    with export_file(fmt, store=store, max_bytes=1024 * 1024):
+        pass
+
+
+@pytest.mark.parametrize("fmt", ["csv", "parquet", "arrow"])
+def test_download_button_accepts_the_export(store, fmt):
+    data, _ = convert_data_to_bytes_and_infer_mime(export_file(fmt, store=store, max_bytes=1024 * 1024),
+                                                   unsupported_error=TypeError(fmt))
+    assert isinstance(data, bytes) and data
@@ -0,0 +1,31 @@
+import os
+
+import pytest
+
+from core import grading
+from core.execution import QueryBudget, QueryBudgetExceeded
+from core.executor import execute
+from core.grading import ExpectedResultCache, grade
+
+WHOLE_TABLE = "SELECT * FROM employees"
+
+
+def test_whole_table_answers_fit_the_budget(monkeypatch):
+    monkeypatch.setattr(grading, "DEFAULT_BUDGET", QueryBudget(max_rows=2))
+    with pytest.raises(QueryBudgetExceeded, match="rows returned"):
+        execute("basics", WHOLE_TABLE, budget=grading.DEFAULT_BUDGET)
+    sql = "SELECT * FROM employees ORDER BY name"
+    run = lambda budget: execute("basics", sql, budget=budget)  # noqa: E731
+    assert grade("basics", WHOLE_TABLE, sql, run, pristine=False)[0]
+
+
+@pytest.mark.parametrize("pickled", [b"\x80\x04cno_such_module\nFrame\n.", b"\x80\x04cpandas\nNoSuchFrame\n."])
+def test_pickles_from_other_versions_are_a_miss(tmp_path, pickled):
+    cache = ExpectedResultCache(str(tmp_path))
+    path = cache._path(cache.key("basics", WHOLE_TABLE))
+    os.makedirs(os.path.dirname(path))
+    with open(path, "wb") as f:
+        f.write(pickled)
+    assert cache.cached("basics", WHOLE_TABLE) is None
+    assert len(cache.get("basics", WHOLE_TABLE)) == 5
+    assert len(ExpectedResultCache(str(tmp_path)).cached("basics", WHOLE_TABLE)) == 5
@@ -0,0 +1,65 @@
+import pytest
+
+from core.leaderboard import Leaderboard
+from core.progress import ProgressStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    return ProgressStore(str(tmp_path / "progress.db"))
+
+
+def solve(store, name, count, category="JOINs"):
+    for index in range(count):
+        store.complete(name, category, index)
+
+
+def ranking(board):
+    return [(standing.rank, standing.name, standing.score) for standing in board.top()]
+
+
+def test_revoked_points_drop_a_student_down_the_list(store):
+    solve(store, "ann", 3)
+    solve(store, "bob", 2)
+    solve(store, "cid", 1)
+    board = Leaderboard(2)
+    board.refresh(store)
+    assert ranking(board) == [(1, "ann", 3), (2, "bob", 2)]
+
+    store.revoke("ann", "JOINs", 0)
+    store.revoke("ann", "JOINs", 1)
+    board.refresh(store)
+    assert ranking(board) == [(1, "bob", 2), (2, "ann", 1)]
+    assert board.standing("cid").rank == 2
+
+
+def test_new_board_replays_revocations(store):
+    solve(store, "ann", 2)
+    store.revoke("ann", "JOINs", 0)
+    solve(store, "bob", 2)
+    board = Leaderboard(10)
+    board.refresh(store)
+    assert ranking(board) == [(1, "bob", 2), (2, "ann", 1)]
+
+
+def test_ties_share_a_rank(store):
+    solve(store, "ann", 2)
+    solve(store, "bob", 2)
+    solve(store, "cid", 1)
+    board = Leaderboard(10)
+    board.refresh(store)
+    assert ranking(board) == [(1, "ann", 2), (1, "bob", 2), (3, "cid", 1)]
+    assert board.standing("nobody") is None
+
+
+def test_incremental_refresh_matches_a_fresh_board(store):
+    board = Leaderboard(3)
+    for round_ in range(4):
+        for i, name in enumerate(["ann", "bob", "cid", "dee", "eve"]):
+            store.complete(name, f"round {round_}", 0, points=(i * 7 + round_ * 3) % 5 + 1)
+        store.revoke("bob", f"round {round_}", 0)
+        board.refresh(store)
+        fresh = Leaderboard(3)
+        fresh.refresh(store)
+        assert ranking(board) == ranking(fresh)
+        assert board.students == fresh.students == 5
@@ -0,0 +1,101 @@
+import os
+
+import pytest
+from streamlit.testing.v1 import AppTest
+
+from core import catalog, config, executor, ui
+from core.executor import QueryPool
+
+PAGES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "pages")
+
+
+def open_page(filename):
+    at = AppTest.from_file(os.path.join(PAGES, filename), default_timeout=30).run()
+    at.text_input[0].input("Tester").run()
+    return at
+
+
+def run_query(at, sql):
+    at.text_area[0].input(sql).run()
+    next(button for button in at.button if "Run Query" in button.label).click().run()
+    assert not at.exception
+    return at
+
+
+@pytest.fixture
+def fetches(monkeypatch):
+    calls = []
+    fetch_page = ui.fetch_page
+
+    def counting(*args, **kwargs):
+        calls.append(args)
+        return fetch_page(*args, **kwargs)
+
+    monkeypatch.setattr(ui, "fetch_page", counting)
+    return calls
+
+
+def test_other_widgets_do_not_run_the_query_again(fetches):
+    at = run_query(open_page("1_Basics_and_Filters.py"), "SELECT * FROM employees")
+    assert len(fetches) == 1
+    at.sidebar.toggle[0].set_value(True).run()
+    at.text_input[0].input("Tester 2").run()
+    assert len(fetches) == 1
+    assert at.dataframe[0].value.shape == (5, 5)
+
+
+def test_changing_page_fetches_the_new_page(fetches):
+    numbers = "WITH RECURSIVE r(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM r WHERE x < 120) SELECT x FROM r"
+    at = run_query(open_page("1_Basics_and_Filters.py"), numbers)
+    next(button for button in at.button if "Next page" in button.label).click().run()
+    assert len(fetches) == 2
+    assert at.dataframe[0].value["x"].iloc[0] == 51
+
+
+@pytest.mark.parametrize("filename", ["1_Basics_and_Filters.py", "2_Complex_Queries.py"])
+def test_invalid_catalog_is_reported(monkeypatch, filename):
+    def broken(lesson):
+        raise catalog.CatalogError(f"Invalid expected queries in the '{lesson}' catalog")
+
+    monkeypatch.setattr(catalog, "get_catalog", broken)
+    at = AppTest.from_file(os.path.join(PAGES, filename), default_timeout=30).run()
+    assert not at.exception
+    assert "Invalid expected queries" in at.error[0].value
+    assert not at.text_area
+
+
+def test_running_the_same_select_twice_only_reads():
+    at = run_query(open_page("1_Basics_and_Filters.py"), "SELECT * FROM employees")
+    next(button for button in at.button if "Run Query" in button.label).click().run()
+    assert not [info for info in at.info if "rows affected" in info.value]
+    assert at.dataframe[0].value.shape == (5, 5)
+    assert next(button for button in at.sidebar.button if "Reset database" in button.label).disabled
+
+
+@pytest.fixture
+def workers(monkeypatch):
+    pool = QueryPool(1, ["basics"])
+    monkeypatch.setattr(config, "QUERY_WORKERS", 1)
+    monkeypatch.setattr(executor, "get_pool", lambda: pool)
+    yield pool
+    pool.shutdown()
+
+
+@pytest.mark.parametrize("sql", ["ATTACH DATABASE 'progress.db' AS p", "PRAGMA query_only = OFF"])
+def test_denied_statements_never_reach_the_pool(workers, sql):
+    at = run_query(open_page("1_Basics_and_Filters.py"), sql)
+    assert "not authorized" in at.error[0].value
+    assert workers.metrics()["completed"] == 0
+
+
+def test_known_verdicts_reuse_the_shown_page(monkeypatch):
+    calls = []
+    execute = ui.execute
+    monkeypatch.setattr(ui, "execute", lambda *args, **kwargs: calls.append(args) or execute(*args, **kwargs))
+    at = open_page("1_Basics_and_Filters.py")
+    sql = "SELECT name, salary FROM employees ORDER BY salary"
+    run_query(at, sql)
+    assert len(calls) == 1
+    run_query(at, sql)
+    assert len(calls) == 1
+    assert at.success[0].value == "Query executed successfully!"
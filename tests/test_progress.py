@@ -0,0 +1,68 @@
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from core.progress import ProgressStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    return ProgressStore(str(tmp_path / "progress.db"))
+
+
+def events(store):
+    conn = store.connect()
+    try:
+        return conn.execute("SELECT name, points FROM score_events ORDER BY rowid").fetchall()
+    finally:
+        conn.close()
+
+
+def test_a_task_counts_once(store):
+    assert store.complete("ann", "JOINs", 0) == (True, 1)
+    assert store.complete("ann", "JOINs", 0) == (False, 1)
+    assert store.complete("ann", "JOINs", 1, points=2) == (True, 3)
+    assert store.progress("ann").score == 3
+    assert store.progress("nobody").score == 0
+
+
+def test_replicas_racing_on_one_task_credit_it_once(tmp_path):
+    path = str(tmp_path / "progress.db")
+    replicas = [ProgressStore(path) for _ in range(4)]
+    with ThreadPoolExecutor(len(replicas)) as pool:
+        results = list(pool.map(lambda replica: replica.complete("ann", "JOINs", 0), replicas * 5))
+    assert sum(new for new, _ in results) == 1
+    assert replicas[0].progress("ann").score == 1
+    assert events(replicas[0]) == [("ann", 1)]
+
+
+def test_revoke_takes_the_points_back(store):
+    store.complete("ann", "JOINs", 0)
+    store.complete("ann", "JOINs", 1)
+    assert store.revoke("ann", "JOINs", 0) == (True, 1)
+    assert store.revoke("ann", "JOINs", 0) == (False, 1)
+    assert store.progress("ann").completed == {("JOINs", 1)}
+
+
+def test_revoked_task_can_be_earned_again(store):
+    store.complete("ann", "JOINs", 0)
+    store.revoke("ann", "JOINs", 0)
+    assert store.complete("ann", "JOINs", 0) == (True, 1)
+    assert events(store) == [("ann", 1), ("ann", -1), ("ann", 1)]
+
+
+def test_events_are_backfilled_from_older_stores(tmp_path):
+    path = str(tmp_path / "progress.db")
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+        CREATE TABLE completions (name TEXT, category TEXT, task_index INTEGER, points INTEGER NOT NULL,
+                                  completed_at TEXT NOT NULL, PRIMARY KEY (name, category, task_index));
+        CREATE TABLE scores (name TEXT PRIMARY KEY, score INTEGER NOT NULL, updated_at TEXT NOT NULL);
+        INSERT INTO completions VALUES ('ann', 'JOINs', 0, 1, '2025-01-01'), ('bob', 'JOINs', 0, 1, '2025-01-02');
+        INSERT INTO scores VALUES ('ann', 1, '2025-01-01'), ('bob', 1, '2025-01-02');
+    """)
+    conn.close()
+    store = ProgressStore(path)
+    ProgressStore(path)  # a second replica opening the same file adds nothing
+    assert events(store) == [("ann", 1), ("bob", 1)]
@@ -0,0 +1,59 @@
+import pytest
+
+from core.leaderboard import Leaderboard
+from core.progress import ProgressStore
+from core.regrade import regrade
+from core.submissions import SubmissionStore
+
+IT_TASK = ("WHERE filters", 1)
+HARD_CODED = "SELECT * FROM employees WHERE department_id = 2"
+BY_NAME = "SELECT e.* FROM employees e JOIN departments d ON d.id = e.department_id WHERE d.name = 'IT'"
+
+
+@pytest.fixture
+def stores(tmp_path):
+    submissions = SubmissionStore(str(tmp_path / "submissions.db"))
+    progress = ProgressStore(str(tmp_path / "progress.db"))
+    yield submissions, progress
+    submissions.close()
+
+
+def test_flipped_verdicts_update_progress(stores):
+    submissions, progress = stores
+    # Graded before the hidden variants existed: the hard-coded id passed, the lookup by name did not
+    submissions.record("alice", *IT_TASK, HARD_CODED, True, 1)
+    progress.complete("alice", *IT_TASK)
+    submissions.record("bob", *IT_TASK, BY_NAME, False, 0)
+    submissions.record("bob", *IT_TASK, "SELECT * FROM employees", False, 0)
+    board = Leaderboard(10)
+    board.refresh(progress)
+    assert board.standing("alice").score == 1
+
+    report = regrade(submissions, workers=1, progress_store=progress)
+
+    assert sorted((name, old, new) for _, name, _, _, old, new in report.changes) == [
+        ("alice", True, False), ("bob", False, True)]
+    assert (report.credited, report.revoked) == (1, 1)
+    assert progress.progress("alice").score == 0
+    assert progress.progress("bob").completed == {IT_TASK}
+    board.refresh(progress)
+    assert [(standing.name, standing.score) for standing in board.top()] == [("bob", 1), ("alice", 0)]
+
+
+def test_dry_run_changes_nothing(stores):
+    submissions, progress = stores
+    submissions.record("alice", *IT_TASK, HARD_CODED, True, 1)
+    progress.complete("alice", *IT_TASK)
+    report = regrade(submissions, workers=1, apply=False, progress_store=progress)
+    assert len(report.changes) == 1
+    assert progress.progress("alice").score == 1
+
+
+def test_worker_processes_grade_like_inline(stores):
+    submissions, progress = stores
+    for index in range(120):
+        submissions.record(f"student{index}", *IT_TASK, f"{BY_NAME} AND e.id > -{index}", False, 0)
+    submissions.record("alice", *IT_TASK, HARD_CODED, True, 1)
+    report = regrade(submissions, workers=2, progress_store=progress)
+    assert len(report.changes) == 121
+    assert report.credited == 120
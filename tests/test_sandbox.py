@@ -0,0 +1,77 @@
+import sqlite3
+import time
+
+import pytest
+
+from core.sandbox import Sandbox, open_sandbox, result_columns, template_bytes
+
+
+def test_template_is_built_once_per_dataset():
+    assert template_bytes("basics") is template_bytes("basics")
+
+
+def test_clones_are_independent():
+    first, second = open_sandbox("basics"), open_sandbox("basics")
+    try:
+        first.execute("DELETE FROM employees")
+        assert first.execute("SELECT COUNT(*) FROM employees").fetchone()[0] == 0
+        assert second.execute("SELECT COUNT(*) FROM employees").fetchone()[0] == 5
+    finally:
+        first.close()
+        second.close()
+
+
+@pytest.fixture
+def sandbox():
+    return Sandbox("basics")
+
+
+@pytest.mark.parametrize("sql", ["SELECT * FROM employees", "PRAGMA table_info(employees)",
+                                 "WITH t AS (SELECT 1) SELECT * FROM t"])
+def test_reads_are_read_only_every_time(sandbox, sql):
+    assert [sandbox.is_read_only(sql) for _ in range(3)] == [True, True, True]
+
+
+@pytest.mark.parametrize("sql", ["DELETE FROM employees", "CREATE INDEX i ON employees (name)",
+                                 "CREATE TEMP TABLE t (x)", "VACUUM"])
+def test_writes_are_not_read_only(sandbox, sql):
+    assert [sandbox.is_read_only(sql) for _ in range(2)] == [False, False]
+
+
+@pytest.mark.parametrize("sql", ["ATTACH DATABASE ':memory:' AS other", "DETACH DATABASE main",
+                                 "PRAGMA query_only = OFF", "PRAGMA case_sensitive_like = 1"])
+def test_denied_statements_are_not_reads(sandbox, sql):
+    assert not sandbox.is_read_only(sql)
+
+
+def test_same_select_after_running_it(sandbox):
+    sandbox.conn.execute("SELECT * FROM employees").fetchall()
+    assert sandbox.is_read_only("SELECT * FROM employees")
+
+
+def test_writes_persist_until_reset(sandbox):
+    _, affected = sandbox.apply("DELETE FROM sales WHERE amount > 12000")
+    assert affected == 2 and sandbox.modified
+    sandbox.reset()
+    assert not sandbox.modified
+    assert sandbox.conn.execute("SELECT COUNT(*) FROM sales").fetchone()[0] == 3
+
+
+def test_attach_is_denied(sandbox):
+    with pytest.raises(sqlite3.DatabaseError):
+        sandbox.conn.execute("ATTACH DATABASE ':memory:' AS other")
+
+
+def test_result_columns_as_spelled():
+    sql = "SELECT Salary * 2, e.name AS Who FROM employees e"
+    assert result_columns("basics", sql) == ["Salary * 2", "Who"]
+
+
+@pytest.mark.parametrize("sql", [
+    "WITH RECURSIVE r(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM r) SELECT COUNT(*) FROM r",
+    "SELECT length(randomblob(500000000))",
+])
+def test_result_columns_gives_up_on_table_free_work(sql):
+    started = time.monotonic()
+    assert result_columns("basics", sql) is None
+    assert time.monotonic() - started < 1
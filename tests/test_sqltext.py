@@ -0,0 +1,47 @@
+import pytest
+
+from core.executor import execute
+from core.grading import grade
+from core.sqltext import fingerprint, header_key, normalize_sql
+
+BY_NAME = "SELECT e.name FROM employees e JOIN departments d ON d.id = e.department_id WHERE d.name = {}"
+
+
+def test_normalize_keeps_literals():
+    assert normalize_sql("select  *\nfrom t -- all\n;") == "SELECT * FROM T"
+    assert normalize_sql("SELECT 'It' , \"It\"") == "SELECT 'It',\"It\""
+
+
+@pytest.mark.parametrize("first, second", [
+    ("SELECT name FROM employees", "select NAME from EMPLOYEES;"),
+    ("SELECT e.name FROM employees e", "SELECT employees.name FROM employees"),
+    ("SELECT x.name FROM employees AS x", "SELECT e.name FROM employees e"),
+    ("SELECT [name] FROM `employees`", "SELECT name FROM employees"),
+    ("SELECT * FROM a INNER JOIN b ON a.id = b.id", "SELECT * FROM a JOIN b ON a.id = b.id"),
+    ("SELECT * FROM t WHERE x <> 1.0", "SELECT * FROM t WHERE x != 1.00"),
+])
+def test_same_answer_same_fingerprint(first, second):
+    assert fingerprint(first) == fingerprint(second)
+
+
+@pytest.mark.parametrize("first, second", [
+    ("SELECT * FROM t WHERE name = 'IT'", "SELECT * FROM t WHERE name = 'it'"),
+    ('SELECT * FROM t WHERE name = "IT"', 'SELECT * FROM t WHERE name = "it"'),
+    ('SELECT * FROM t WHERE name = "IT"', "SELECT * FROM t WHERE name = it"),
+    ("SELECT salary + 1 FROM t", "SELECT salary+1 AS x FROM t"),
+    ("SELECT * FROM t ORDER BY a", "SELECT * FROM t ORDER BY a DESC"),
+])
+def test_different_answers_different_fingerprints(first, second):
+    assert fingerprint(first) != fingerprint(second)
+
+
+def test_header_key_keeps_double_quoted_text():
+    assert header_key('SELECT "Hungary"') != header_key('SELECT "HUNGARY"')
+    assert header_key("SELECT [name], `salary` FROM t") == ""
+
+
+def test_double_quoted_strings_are_graded_by_value():
+    expected = BY_NAME.format("'IT'")
+    for literal, correct in [('"IT"', True), ('"it"', False), ('"It"', False)]:
+        sql = BY_NAME.format(literal)
+        assert grade("basics", expected, sql, lambda budget: execute("basics", sql, budget=budget))[0] is correct
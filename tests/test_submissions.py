@@ -0,0 +1,186 @@
+import random
+import sqlite3
+import time
+from datetime import date, timedelta
+
+import pandas as pd
+import pytest
+
+from core import submissions
+from core.submissions import SubmissionStore, SubmissionTail, hardest_tasks
+
+YESTERDAY = (date.today() - timedelta(days=1)).isoformat()
+
+
+def add_old_rows(store, day, count):
+    conn = store.connect()
+    with conn:
+        conn.executemany("INSERT INTO submissions (timestamp, name, category, task_index, query, correct, score) "
+                         "VALUES (?, 'old', 'WHERE filters', 0, ?, 1, 1)",
+                         [(f"{day}T12:00:{i:02d}", f"SELECT {i}") for i in range(count)])
+    conn.close()
+
+
+def partitions(store):
+    conn = store.connect()
+    try:
+        return conn.execute("SELECT day, rows FROM partitions").fetchall()
+    finally:
+        conn.close()
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = SubmissionStore(str(tmp_path / "submissions.db"))
+    yield store
+    store.close()
+
+
+def test_compaction_keeps_every_row_readable_once(store):
+    add_old_rows(store, YESTERDAY, 3)
+    store.record("new", "WHERE filters", 0, "SELECT 1", True, 1)
+    store.flush()
+    assert store.compact() == [YESTERDAY]
+    assert partitions(store) == [(YESTERDAY, 3)]
+    add_old_rows(store, YESTERDAY, 2)
+    store.compact()
+    assert partitions(store) == [(YESTERDAY, 5)]
+    assert len(store.read_frame()) == 6
+    assert len(store.read_frame(since=YESTERDAY, until=YESTERDAY)) == 5
+    assert list(store.read_frame(since=date.today().isoformat())["name"]) == ["new"]
+
+
+def test_idle_writer_still_compacts(tmp_path):
+    store = SubmissionStore(str(tmp_path / "submissions.db"), compact_interval=0.1)
+    try:
+        add_old_rows(store, YESTERDAY, 2)
+        deadline = time.monotonic() + 5
+        while not partitions(store) and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert partitions(store) == [(YESTERDAY, 2)]
+    finally:
+        store.close()
+
+
+def test_tail_reads_new_rows_in_chunks(store, monkeypatch):
+    monkeypatch.setattr(submissions, "TAIL_CHUNK_ROWS", 4)
+    tail = SubmissionTail(store)
+    assert tail.refresh() == 0
+    assert tail.frame().empty
+    for count in [3, 2, 5]:
+        add_old_rows(store, YESTERDAY, count)
+        tail.refresh()
+    # The first two refreshes share a chunk; the third starts a new one
+    assert [len(chunk) for chunk in tail._chunks] == [5, 5]
+    assert tail.rows(3, 7)["query"].tolist() == ["SELECT 0", "SELECT 1", "SELECT 0", "SELECT 1"]
+    assert tail.frame().index.tolist() == list(range(1, 11))
+    tail.reset()
+    assert tail.refresh() == 10
+
+
+def test_locked_database_is_retried(store, monkeypatch):
+    summarize = SubmissionStore._summarize
+    failures = [sqlite3.OperationalError("database is locked")]
+
+    def locked_once(conn, rows):
+        if failures:
+            raise failures.pop()
+        summarize(conn, rows)
+
+    monkeypatch.setattr(submissions, "WRITE_RETRY_DELAY", 0.01)
+    monkeypatch.setattr(SubmissionStore, "_summarize", staticmethod(locked_once))
+    store.record("alice", "WHERE filters", 0, "SELECT 1", True, 1)
+    store.flush()
+    assert not failures
+    assert store.read_frame()["name"].tolist() == ["alice"]
+    assert store.student_summary()["attempts"].tolist() == [1]
+
+
+def test_rejected_row_does_not_drop_its_batch(store):
+    store._queue.put(("not", "a", "submission"))
+    store.record("alice", "WHERE filters", 0, "SELECT 1", True, 1)
+    store.flush()
+    assert store.read_frame()["name"].tolist() == ["alice"]
+
+
+def submit_history(store, count=200, seed=7):
+    """Random attempts by a few students on a few tasks, a minute apart, through the writer."""
+    rng = random.Random(seed)
+    for minute in range(count):
+        timestamp = f"2026-01-05T{8 + minute // 60:02d}:{minute % 60:02d}:00"
+        task_index = rng.randrange(6)
+        # Later tasks are harder
+        correct = rng.random() < 0.5 / (task_index + 1)
+        store._queue.put((timestamp, f"student{rng.randrange(8)}", "WHERE filters", task_index,
+                          f"SELECT {minute}", correct, 0, None, None, None, None))
+    store.flush()
+
+
+def summaries_from_log(frame):
+    """Student and task summaries computed directly from the log, for comparison."""
+    frame = frame.sort_index().assign(timestamp=lambda df: pd.to_datetime(df["timestamp"]))
+    keys = ["name", "category", "task_index"]
+    frame["attempt"] = frame.groupby(keys).cumcount() + 1
+    firsts = frame.groupby(keys).agg(first_attempt=("timestamp", "first"))
+    solves = frame[frame["correct"]].groupby(keys).agg(first_correct=("timestamp", "first"),
+                                                       attempts_to_solve=("attempt", "first"))
+    per_student_task = firsts.join(solves).reset_index()
+    per_student_task["seconds"] = (per_student_task["first_correct"]
+                                   - per_student_task["first_attempt"]).dt.total_seconds()
+
+    students = frame.groupby("name").agg(attempts=("correct", "size"), correct=("correct", "sum"))
+    students["solved"] = per_student_task.groupby("name")["first_correct"].count()
+    tasks = frame.groupby(["category", "task_index"]).agg(attempts=("correct", "size"),
+                                                         correct=("correct", "sum"))
+    by_task = per_student_task.groupby(["category", "task_index"])
+    tasks["students"] = by_task.size()
+    tasks["solvers"] = by_task["first_correct"].count()
+    tasks["attempts_to_solve"] = by_task["attempts_to_solve"].sum() / tasks["solvers"]
+    tasks["seconds_to_solve"] = by_task["seconds"].sum() / tasks["solvers"]
+    return students, tasks
+
+
+def assert_summaries_match(store):
+    students, tasks = summaries_from_log(store.read_frame())
+    summary = store.student_summary().set_index("name").sort_index()
+    assert summary[["attempts", "correct", "solved"]].to_dict() == students.to_dict()
+
+    summary = store.task_summary().set_index(["category", "task_index"])
+    for column in ["attempts", "students", "solvers"]:
+        assert summary[column].tolist() == tasks[column].tolist()
+    assert summary["success_rate"].tolist() == (tasks["correct"] / tasks["attempts"]).tolist()
+    pd.testing.assert_series_equal(summary["attempts_to_solve"], tasks["attempts_to_solve"], check_names=False)
+    pd.testing.assert_series_equal(summary["minutes_to_solve"], tasks["seconds_to_solve"] / 60,
+                                   check_names=False)
+
+
+def test_incremental_summaries_match_the_log(store):
+    submit_history(store)
+    assert_summaries_match(store)
+    # Rebuilding from the log gives the same tables the writer kept up to date
+    before = store.student_summary(), store.task_summary()
+    store.rebuild_summaries()
+    pd.testing.assert_frame_equal(store.student_summary(), before[0])
+    pd.testing.assert_frame_equal(store.task_summary(), before[1])
+
+
+def test_summaries_follow_changed_verdicts(store):
+    submit_history(store)
+    frame = store.read_frame()
+    flipped = frame.sample(60, random_state=3)
+    store.update_verdicts([(int(submission_id), not correct)
+                           for submission_id, correct in flipped["correct"].items()])
+    assert store.read_frame()["correct"].sum() != frame["correct"].sum()
+    assert_summaries_match(store)
+
+
+def test_hardest_tasks_solved_by_fewest(store):
+    submit_history(store)
+    store._queue.put(("2026-01-05T20:00:00", "student0", "WHERE filters", 9, "SELECT 0", False, 0,
+                      None, None, None, None))
+    store.flush()
+    summary = store.task_summary()
+    hardest = hardest_tasks(summary, count=3)
+    assert hardest["task_index"].iloc[0] == 9
+    assert hardest["solve_rate"].is_monotonic_increasing
+    assert hardest["solve_rate"].iloc[-1] <= summary.drop(hardest.index)["solve_rate"].min()
@@ -0,0 +1,47 @@
+import sqlite3
+
+import pytest
+
+from core import config
+from core.datasets import DATASETS
+from core.variants import VariantDataset
+
+NAMES_BY_DEPARTMENT = ("SELECT d.name, e.name FROM employees e JOIN departments d ON d.id = e.department_id "
+                       "ORDER BY 1, 2")
+
+
+@pytest.fixture
+def variant(monkeypatch, tmp_path):
+    monkeypatch.setattr(config, "DATASET_DIR", str(tmp_path))
+    return VariantDataset(DATASETS["complex"], 7)
+
+
+def loaded(dataset):
+    conn = sqlite3.connect(":memory:")
+    dataset.load(conn)
+    return conn
+
+
+def test_keys_move_and_foreign_keys_follow(variant):
+    base, moved = loaded(DATASETS["complex"]), loaded(variant)
+    assert moved.execute(NAMES_BY_DEPARTMENT).fetchall() == base.execute(NAMES_BY_DEPARTMENT).fetchall()
+    ids = "SELECT id FROM employees ORDER BY id"
+    assert moved.execute(ids).fetchall() != base.execute(ids).fetchall()
+    assert moved.execute("PRAGMA foreign_key_check").fetchall() == []
+
+
+def test_values_are_scaled_keeping_ties_and_order(variant):
+    base, moved = loaded(DATASETS["complex"]), loaded(variant)
+    by_name = "SELECT name, salary FROM employees ORDER BY name"
+    before, after = base.execute(by_name).fetchall(), moved.execute(by_name).fetchall()
+    assert [name for name, _ in before] == [name for name, _ in after]
+    assert [salary for _, salary in before] != [salary for _, salary in after]
+    assert len({salary for _, salary in before}) == len({salary for _, salary in after})
+
+
+def test_built_once_into_a_file(variant, monkeypatch):
+    first = loaded(variant)
+    monkeypatch.setattr(VariantDataset, "_build", lambda self, conn: pytest.fail("rebuilt"))
+    again = loaded(variant)
+    query = "SELECT * FROM employees ORDER BY id"
+    assert again.execute(query).fetchall() == first.execute(query).fetchall()